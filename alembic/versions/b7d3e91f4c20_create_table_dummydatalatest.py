@@ -0,0 +1,57 @@
+"""create table DummyDataLatest
+
+Revision ID: b7d3e91f4c20
+Revises: 8c41d2e7a5b3
+Create Date: 2026-10-18 15:02:37.118904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e91f4c20'
+down_revision: Union[str, None] = '8c41d2e7a5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('electricDummyDataLatest',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('category', sa.String(length=16), nullable=False),
+    sa.Column('data_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('zone', sa.String(), nullable=True),
+    sa.Column('province', sa.String(), nullable=True),
+    sa.Column('value_tag', sa.String(), nullable=True),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('submit_timestamp', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('category', 'data_timestamp', 'zone', 'province', 'value_tag', name='uq_electricDummyDataLatest_key', postgresql_nulls_not_distinct=True)
+    )
+    # *backfill from the latest submission of every data_timestamp, NULL
+    # *keys stay apart from ''
+    op.execute('''
+        INSERT INTO "electricDummyDataLatest"
+            (category, data_timestamp, zone, province, value_tag, value,
+             submit_timestamp)
+        SELECT category, data_timestamp, zone, province, value_tag,
+               sum(value), submit_timestamp
+        FROM (
+            SELECT *, rank() OVER (
+                PARTITION BY category, data_timestamp
+                ORDER BY submit_timestamp DESC) AS submission_rank
+            FROM "electricDummyData"
+        ) ranked
+        WHERE submission_rank = 1
+        GROUP BY category, data_timestamp, zone, province, value_tag,
+                 submit_timestamp
+    ''')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('electricDummyDataLatest')
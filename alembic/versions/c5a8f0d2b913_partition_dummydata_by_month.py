@@ -0,0 +1,104 @@
+"""partition DummyData by data_timestamp month
+
+Revision ID: c5a8f0d2b913
+Revises: b7d3e91f4c20
+Create Date: 2026-10-18 15:47:09.530281
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a8f0d2b913'
+down_revision: Union[str, None] = 'b7d3e91f4c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = 'id, submit_timestamp, data_timestamp, category, zone, province, value_tag, value'
+OLD_INDEXES = ['id', 'submit_timestamp', 'data_timestamp', 'category', 'zone', 'province', 'value_tag']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('ALTER TABLE "electricDummyData" RENAME TO "electricDummyData_old"')
+    op.execute('ALTER TABLE "electricDummyData_old" RENAME CONSTRAINT "electricDummyData_pkey" TO "electricDummyData_old_pkey"')
+    for column in OLD_INDEXES:
+        op.drop_index(f'ix_electricDummyData_{column}', table_name='electricDummyData_old')
+
+    op.create_table('electricDummyData',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('submit_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('data_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('category', sa.String(length=16), nullable=False),
+    sa.Column('zone', sa.String(), nullable=True),
+    sa.Column('province', sa.String(), nullable=True),
+    sa.Column('value_tag', sa.String(), nullable=True),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'data_timestamp', name='electricDummyData_pkey'),
+    postgresql_partition_by='RANGE (data_timestamp)'
+    )
+    op.create_index('ix_electricDummyData_category_data_submit', 'electricDummyData', ['category', 'data_timestamp', 'submit_timestamp'], unique=False)
+    op.create_index('ix_electricDummyData_data_timestamp_brin', 'electricDummyData', ['data_timestamp'], unique=False, postgresql_using='brin')
+    op.create_index('ix_electricDummyData_submit_timestamp_brin', 'electricDummyData', ['submit_timestamp'], unique=False, postgresql_using='brin')
+
+    # *default partition plus one partition per month already in the table,
+    # *named like crud.electric.dummy_data_partition_name
+    op.execute('CREATE TABLE "electricDummyData_default" PARTITION OF "electricDummyData" DEFAULT')
+    op.execute('''
+        DO $$
+        DECLARE month date;
+        BEGIN
+            FOR month IN
+                SELECT DISTINCT date_trunc('month', data_timestamp)::date
+                FROM "electricDummyData_old"
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF "electricDummyData" FOR VALUES FROM (%L) TO (%L)',
+                    'electricDummyData_' || to_char(month, 'YYYY_MM'),
+                    month, (month + interval '1 month')::date);
+            END LOOP;
+        END $$
+    ''')
+
+    op.execute(f'INSERT INTO "electricDummyData" ({COLUMNS}) SELECT {COLUMNS} FROM "electricDummyData_old"')
+    op.execute('''
+        SELECT setval(pg_get_serial_sequence('"electricDummyData"', 'id'),
+                      coalesce(max(id), 0) + 1, false)
+        FROM "electricDummyData"
+    ''')
+    op.drop_table('electricDummyData_old')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('ALTER TABLE "electricDummyData" RENAME TO "electricDummyData_partitioned"')
+    op.execute('ALTER TABLE "electricDummyData_partitioned" RENAME CONSTRAINT "electricDummyData_pkey" TO "electricDummyData_partitioned_pkey"')
+    op.drop_index('ix_electricDummyData_category_data_submit', table_name='electricDummyData_partitioned')
+    op.drop_index('ix_electricDummyData_data_timestamp_brin', table_name='electricDummyData_partitioned')
+    op.drop_index('ix_electricDummyData_submit_timestamp_brin', table_name='electricDummyData_partitioned')
+
+    op.create_table('electricDummyData',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('submit_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('data_timestamp', sa.DateTime(), nullable=False),
+    sa.Column('category', sa.String(length=16), nullable=False),
+    sa.Column('zone', sa.String(), nullable=True),
+    sa.Column('province', sa.String(), nullable=True),
+    sa.Column('value_tag', sa.String(), nullable=True),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name='electricDummyData_pkey')
+    )
+    for column in OLD_INDEXES:
+        op.create_index(f'ix_electricDummyData_{column}', 'electricDummyData', [column], unique=False)
+
+    op.execute(f'INSERT INTO "electricDummyData" ({COLUMNS}) SELECT {COLUMNS} FROM "electricDummyData_partitioned"')
+    op.execute('''
+        SELECT setval(pg_get_serial_sequence('"electricDummyData"', 'id'),
+                      coalesce(max(id), 0) + 1, false)
+        FROM "electricDummyData"
+    ''')
+    # *drops every attached partition with it, detached months are kept
+    op.drop_table('electricDummyData_partitioned')
@@ -0,0 +1,45 @@
+"""unique keys on PeakDay and EodValue
+
+Revision ID: d3f1a7c6e204
+Revises: c5a8f0d2b913
+Create Date: 2026-10-18 17:12:40.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f1a7c6e204'
+down_revision: Union[str, None] = 'c5a8f0d2b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # *duplicates left by concurrent select-then-insert upserts, the last
+    # *written row of each key is kept
+    op.execute('''
+        DELETE FROM "electricPeakDay" AS peak
+        USING "electricPeakDay" AS newer
+        WHERE peak.peak_date = newer.peak_date
+          AND peak.peak_type = newer.peak_type
+          AND peak.id < newer.id
+    ''')
+    op.execute('''
+        DELETE FROM "naturalGasEodValue" AS eod
+        USING "naturalGasEodValue" AS newer
+        WHERE eod.date = newer.date
+          AND eod.tag = newer.tag
+          AND (eod.update_timestamp, eod.id) < (newer.update_timestamp, newer.id)
+    ''')
+    op.create_unique_constraint('uq_electricPeakDay_date_type', 'electricPeakDay', ['peak_date', 'peak_type'])
+    op.create_unique_constraint('uq_naturalGasEodValue_date_tag', 'naturalGasEodValue', ['date', 'tag'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_naturalGasEodValue_date_tag', 'naturalGasEodValue', type_='unique')
+    op.drop_constraint('uq_electricPeakDay_date_type', 'electricPeakDay', type_='unique')
@@ -0,0 +1,29 @@
+"""add content_hash to Project
+
+Revision ID: e8b2c4d1f637
+Revises: d3f1a7c6e204
+Create Date: 2026-10-18 18:05:22.640913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b2c4d1f637'
+down_revision: Union[str, None] = 'd3f1a7c6e204'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # *existing rows have no hash yet, the next registry upload rewrites them
+    op.add_column('electricProjects', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('electricProjects', 'content_hash')
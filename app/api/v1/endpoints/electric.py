@@ -1,15 +1,15 @@
 import gc
-import csv
+import asyncio
 import logging
-from io import StringIO, BytesIO
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, date, time
-from openpyxl import load_workbook
 from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
-from app.crud import egat_api
+from app.crud import egat_api, genmw, project_sheet
 from app.crud import electric as crud
-from app.db.session import get_db
-from app.schemas.utils import Items, Item, Msg, ItemWithPercent, TimeseriesItem, ItemWithTimestamp, LocationItem
+from app.db.session import get_db, async_session
+from app.core import snapshot, resample, ingest, jobs, workers
+from app.core.config import settings
+from app.schemas.utils import Items, Item, JobMsg, ClusterItem, ItemWithPercent, TimeseriesItem, ItemWithTimestamp, LocationItem
 from app.schemas import electric as schemas
 from typing import Optional
 from time import time as runtime
@@ -19,9 +19,26 @@ router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+# *sysgen/actual indices, see egat_api.get_reqMw
+VSPP_INDICES = [13, 14, 15, 16, 12]
+DEMAND_INDICES = [1, 2, 3, 4, 5, 6, 7, 12, 13, 14, 15, 16]
+
+# *required CSV columns of the /submit uploads
+DUMMY_COLUMNS = {'DTM', 'ZONE', 'PROVINCE', 'TYPE', 'VALDUMMY'}
+PEAK_COLUMNS = {'Time', 'Value'}
+
 
 @router.get("/current/supply")
 async def get_current_supply(is_include_ips: Optional[bool] = True, source: int = 1, db: AsyncSession = Depends(get_db)) -> Items:
+    # *default view is served from the poller snapshot while it is fresh,
+    # *every view keeps its last good response for upstream failures
+    name = 'electric/current/supply'
+    if not (is_include_ips and source == 1):
+        name += f'?is_include_ips={is_include_ips}&source={source}'
+    return await snapshot.get_or_build(name, lambda: build_current_supply(is_include_ips=is_include_ips, source=source, db=db))
+
+
+async def build_current_supply(is_include_ips: Optional[bool], source: int, db: AsyncSession) -> Items:
     start_time = runtime()
     items = Items(datetime=datetime.now(), status='ok')
     total_item = Item(tag='total')
@@ -33,30 +50,13 @@ async def get_current_supply(is_include_ips: Optional[bool] = True, source: int
     imp_item = Item(tag='imp')
     try:
         #* EGAT, IPP, SPP
-        if source == 1:
-            for data in egat_api.get_current_genMw_source1():
-                if 'EGAT' in data['plant_type']:
-                    egat_item.value += data['value']
-                elif 'IPP' in data['plant_type']:
-                    ipp_item.value += data['value']
-                elif 'SPP' in data['plant_type']:
-                    spp_item.value += data['value']
-                elif 'imp' in data['plant_type']:
-                    imp_item.value += data['value']
+        if source in (1, 2):
+            type_items = {'egat': egat_item, 'ipp': ipp_item, 'spp': spp_item, 'imp': imp_item}
+            async for data in egat_api.get_current_genMw(source):
+                type_items[data['plant_type']].value += data['value']
                 items.datetime = data['data_timestamp']
-        elif source == 2:
-            for data in egat_api.get_current_genMw_source2():
-                if 'EGAT' in data['plant_type']:
-                    egat_item.value += data['value']
-                elif 'IPP' in data['plant_type']:
-                    ipp_item.value += data['value']
-                elif 'SPP' in data['plant_type']:
-                    spp_item.value += data['value']
-                elif 'imp' in data['plant_type']:
-                    imp_item.value += data['value']
-                items.datetime = data['data_timestamp']   
         elif source == 3:
-            for data in egat_api.get_current_genMw_source3():
+            async for data in egat_api.get_current_genMw_source3():
                 if data['COMPANYTYPE'] == 'EGAT':
                     egat_item.value += data['VALUE']
                 elif data['COMPANYTYPE'] == 'IPP':
@@ -67,18 +67,13 @@ async def get_current_supply(is_include_ips: Optional[bool] = True, source: int
         else:
             raise HTTPException(status_code=400, detail='soucre should be 1, 2, or 3')
         
-        min_today = items.datetime.hour*60
+        seconds_today = items.datetime.hour*3600 + items.datetime.minute*60
         # *VSPP
-        data = egat_api.get_reqMw_selected_min(13, datetime.today(), min_today)
-        vspp_item.value += data[1]
-        data = egat_api.get_reqMw_selected_min(14, datetime.today(), min_today)
-        vspp_item.value += data[1]
-        data = egat_api.get_reqMw_selected_min(15, datetime.today(), min_today)
-        vspp_item.value += data[1]
-        data = egat_api.get_reqMw_selected_min(16, datetime.today(), min_today)
-        vspp_item.value += data[1]
-        data = egat_api.get_reqMw_selected_min(12, datetime.today(), min_today)
-        vspp_item.value += data[1]
+        vspp_data, errors = await egat_api.get_reqMw_batch(VSPP_INDICES, datetime.today())
+        if errors:
+            raise HTTPException(status_code=500, detail=f'reqMw failed for indices {list(errors)}')
+        for data in vspp_data.values():
+            vspp_item.value += resample.value_at(data['list'], seconds_today)[1]
 
         # *IPS
         if is_include_ips:
@@ -105,47 +100,48 @@ async def get_current_demand(
     is_include_ips: Optional[bool] = False,
     db: AsyncSession = Depends(get_db)
 ) -> Items:
+    # *default view is served from the poller snapshot while it is fresh,
+    # *every view keeps its last good response for upstream failures
+    name = 'electric/current/demand'
+    if is_include_ips:
+        name += '?is_include_ips=True'
+    return await snapshot.get_or_build(name, lambda: build_current_demand(is_include_ips=is_include_ips, db=db))
+
+
+async def build_current_demand(is_include_ips: Optional[bool], db: AsyncSession) -> Items:
     start_time = runtime()
     try:
+        # *VSPP, Export, 3E and EGAT customer direct in one round trip
+        (reqmw, errors), customer_direct = await asyncio.gather(
+            egat_api.get_reqMw_batch(DEMAND_INDICES, datetime.today()),
+            egat_api.get_total_lasted_customerDirect())
+        if errors:
+            raise HTTPException(status_code=500, detail=f'reqMw failed for indices {list(errors)}')
+        latest = {index: data['list'][-1][-1] for index, data in reqmw.items()}
+
         # *VSPP
-        data = egat_api.get_reqMw(13, datetime.today())
-        item_vspp_rcc1 = Item(tag='vspp_rcc1',
-                                      value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(14, datetime.today())
-        item_vspp_rcc2 = Item(tag='vspp_rcc2',
-                                      value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(15, datetime.today())
-        item_vspp_rcc3 = Item(tag='vspp_rcc3',
-                                      value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(16, datetime.today())
-        item_vspp_rcc4 = Item(tag='vspp_rcc4',
-                                      value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(12, datetime.today())
-        item_vspp_mcc = Item(tag='vspp_mcc',
-                                     value=data['list'][-1][-1])
+        item_vspp_rcc1 = Item(tag='vspp_rcc1', value=latest[13])
+        item_vspp_rcc2 = Item(tag='vspp_rcc2', value=latest[14])
+        item_vspp_rcc3 = Item(tag='vspp_rcc3', value=latest[15])
+        item_vspp_rcc4 = Item(tag='vspp_rcc4', value=latest[16])
+        item_vspp_mcc = Item(tag='vspp_mcc', value=latest[12])
 
         # * Export
-        data = egat_api.get_reqMw(6, datetime.today())
-        item_exp_edl = Item(tag='exp_edl', value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(7, datetime.today())
-        item_exp_tnp = Item(tag='exp_tnp', value=data['list'][-1][-1])
+        item_exp_edl = Item(tag='exp_edl', value=latest[6])
+        item_exp_tnp = Item(tag='exp_tnp', value=latest[7])
 
         # *3E
-        data = egat_api.get_reqMw(1, datetime.today())
-        item_rcc1 = Item(tag='rcc1', value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(2, datetime.today())
-        item_rcc2 = Item(tag='rcc2', value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(3, datetime.today())
-        item_rcc3 = Item(tag='rcc3', value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(4, datetime.today())
-        item_rcc4 = Item(tag='rcc4', value=data['list'][-1][-1])
-        data = egat_api.get_reqMw(5, datetime.today())
-        item_mcc = Item(tag='mcc', value=data['list'][-1][-1])
+        item_rcc1 = Item(tag='rcc1', value=latest[1])
+        item_rcc2 = Item(tag='rcc2', value=latest[2])
+        item_rcc3 = Item(tag='rcc3', value=latest[3])
+        item_rcc4 = Item(tag='rcc4', value=latest[4])
+        item_mcc = Item(tag='mcc', value=latest[5])
 
+        data = reqmw[5]
         base_date = datetime.strptime(data['day'], "%d-%m-%Y")
         time_delta = timedelta(seconds=data['list'][-1][0])
         data_datetime = base_date + time_delta
-        del data
+        del data, reqmw
         gc.collect()
 
         mea_value = item_mcc.value + item_vspp_mcc.value
@@ -173,9 +169,8 @@ async def get_current_demand(
 
         # *EGAT customer direct
         egat_value = 0
-        data = egat_api.get_total_lasted_customerDirect()
-        egat_value += data['value']
-        total_value += data['value']
+        egat_value += customer_direct['value']
+        total_value += customer_direct['value']
 
         percent = round(egat_value*100/total_value,2)
         item_egat = ItemWithPercent(tag='egat', value=round(egat_value,4), percent=percent)
@@ -203,7 +198,7 @@ async def get_current_demand(
                                 peak_date=data_datetime.date(),
                                 peak_datetime=data_datetime,
                                 peak_type='demand',
-                                value=peak
+                                value=item_total.value
                             )
                             logger.debug(f'peak: {peak}')
                             await crud.upsert_peak(db, peak=peak)
@@ -221,9 +216,11 @@ async def get_current_demand(
         return Items(datetime=datetime.now(), status='error', items=[])
 
 @router.get("/profile/supply")
-async def get_profile_supply(is_include_ips: Optional[bool] = True, source: int = 1, db: AsyncSession = Depends(get_db)) -> Items:
+async def get_profile_supply(is_include_ips: Optional[bool] = True, source: int = 1, profile_date: Optional[date] = None, resolution: int = 30, aggregation: str = 'last', db: AsyncSession = Depends(get_db)) -> Items:
+    __check_resolution(resolution, aggregation)
     start_time = runtime()
     items = Items(datetime=datetime.now(), status='ok')
+    profile_date = profile_date or date.today()
     total_item = TimeseriesItem(tag='total')
     egat_item = TimeseriesItem(tag='egat')
     ipp_item = TimeseriesItem(tag='ipp')
@@ -235,69 +232,56 @@ async def get_profile_supply(is_include_ips: Optional[bool] = True, source: int
     try:
         #* EGAT, IPP, SPP
         logger.info('retriveing EGAT, IPP, SPP, IMP')
-        if source == 1:
-            for data in egat_api.get_profile_genMw_group_by_type_source1(items.datetime.date()):
-                if  data['tag'] == 'egat':
-                    egat_item.values = data['values']
-                elif data['tag'] == 'ipp':
-                    ipp_item.values = data['values']
-                elif data['tag'] == 'spp':
-                    spp_item.values = data['values']
-                elif data['tag'] == 'imp':
-                    imp_item.values = data['values']
-                elif data['tag'] == 'total':
-                    total_item.values = data['values']
-        elif source == 2:
-            for data in egat_api.get_profile_genMw_group_by_type_source2(items.datetime.date()):
-                if  data['tag'] == 'egat':
-                    egat_item.values = data['values']
-                elif data['tag'] == 'ipp':
-                    ipp_item.values = data['values']
-                elif data['tag'] == 'spp':
-                    spp_item.values = data['values']
-                elif data['tag'] == 'imp':
-                    imp_item.values = data['values']
-                elif data['tag'] == 'total':
-                    total_item.values = data['values']
-        else:
+        if source not in [1, 2]:
             raise HTTPException(status_code=400, detail='soucre should be 1, 2, or 3')
+        async for data in egat_api.get_profile_genMw(profile_date, source=source, group_by='type', db=db):
+            if  data['tag'] == 'egat':
+                egat_item.values = data['values']
+            elif data['tag'] == 'ipp':
+                ipp_item.values = data['values']
+            elif data['tag'] == 'spp':
+                spp_item.values = data['values']
+            elif data['tag'] == 'imp':
+                imp_item.values = data['values']
+            elif data['tag'] == 'total':
+                total_item.values = data['values']
         del data 
         gc.collect()
         # *VSPP
         logger.info('retriveing VSPP')
 
-        start_min = total_item.values[0][0].hour*60 + total_item.values[0][0].minute
-        end_min = 24*60
-        func2 = iter(egat_api.get_reqMw_profile(14, datetime.today(), strat_min=start_min, end_min=end_min, interval_min=30))
-        func3 = iter(egat_api.get_reqMw_profile(15, datetime.today(), strat_min=start_min, end_min=end_min, interval_min=30))
-        func4 = iter(egat_api.get_reqMw_profile(16, datetime.today(), strat_min=start_min, end_min=end_min, interval_min=30))
-        func5 = iter(egat_api.get_reqMw_profile(12, datetime.today(), strat_min=start_min, end_min=end_min, interval_min=30))
-        i = 0
-        for data1 in egat_api.get_reqMw_profile(13, datetime.today(), strat_min=start_min, end_min=end_min, interval_min=30):
-            data2 =next(func2)
-            data3 =next(func3)
-            data4 =next(func4)
-            data5 =next(func5)
-            value = data1[1]+data2[1]+data3[1]+data4[1]+data5[1]
-            vspp_item.values.append((total_item.values[i][0], value))
-            old_dt, old_value = total_item.values[i]
-            total_item.values[i]= (old_dt, old_value+value)
-            i += 1
-        
+        vspp_data, errors = await egat_api.get_reqMw_batch(VSPP_INDICES, profile_date, db=db)
+        if errors:
+            raise HTTPException(status_code=500, detail=f'reqMw failed for indices {list(errors)}')
+        # *half-hour buckets keyed by seconds since midnight, like the genMw columns
+        vspp_buckets = [dict(resample.resample(vspp_data[index]['list'], 30)) for index in VSPP_INDICES]
+        # *the half-hour still in progress only has its first minutes, it is
+        # *left out instead of passing for a settled value
+        midnight = datetime.combine(profile_date, time(0, 0))
+        now = datetime.now()
+        for i, (dt, total) in enumerate(total_item.values):
+            seconds = int((dt - midnight).total_seconds())
+            if dt > now or not all(seconds in buckets for buckets in vspp_buckets):
+                continue
+            value = sum(buckets[seconds] for buckets in vspp_buckets)
+            vspp_item.values.append((dt, value))
+            total_item.values[i] = (dt, total + value)
 
         # *IPS
         logger.info('retriveing IPS')
         if is_include_ips:
             datetime_from = total_item.values[0][0]
             datetime_to = total_item.values[-1][0]
-            i = 0
+            positions = {dt: i for i, (dt, _) in enumerate(total_item.values)}
             async for data in crud.get_profile_dummy_data(db=db, category='ips', datetime_from=datetime_from, datetime_to=datetime_to, min_interval=30):
                 ips_item.values.append(data)
-                old_dt, old_value = total_item.values[i]
-                total_item.values[i]= (old_dt, old_value+data[1])
-                i += 1
+                i = positions.get(data[0])
+                if i is not None:
+                    old_dt, old_value = total_item.values[i]
+                    total_item.values[i] = (old_dt, old_value + data[1])
 
         items.items = [total_item, egat_item, ipp_item, spp_item, vspp_item, ips_item, imp_item]
+        __resample_items(items, resolution, aggregation)
     except Exception as e:
         logger.exception(e)
         items.status = 'error'
@@ -306,9 +290,11 @@ async def get_profile_supply(is_include_ips: Optional[bool] = True, source: int
 
 
 @router.get("/profile/supply/fuel")
-async def get_profile_supply_fuel(is_include_ips: Optional[bool] = True, source: int = 1, db: AsyncSession = Depends(get_db)) -> Items:
+async def get_profile_supply_fuel(is_include_ips: Optional[bool] = True, source: int = 1, profile_date: Optional[date] = None, resolution: int = 30, aggregation: str = 'last', db: AsyncSession = Depends(get_db)) -> Items:
+    __check_resolution(resolution, aggregation)
     start_time = runtime()
     items = Items(datetime=datetime.now(), status='ok')
+    profile_date = profile_date or date.today()
     gas_item = TimeseriesItem(tag='ก๊าซธรรมชาติ')
     renew_item = TimeseriesItem(tag='พลังงานทดแทน')
     hydro_item = TimeseriesItem(tag='พลังงานน้ำ')
@@ -318,83 +304,51 @@ async def get_profile_supply_fuel(is_include_ips: Optional[bool] = True, source:
     try:
         #* EGAT, IPP, SPP
         logger.info('retriveing EGAT, IPP, SPP, IMP')
-        if source == 1:
-            for data in egat_api.get_profile_genMw_group_by_fuel_source1(items.datetime.date()):
-                if  data['tag'] == 'ก๊าซธรรมชาติ':
-                    gas_item.values = data['values']
-                elif data['tag'] == 'พลังงานทดแทน':
-                    renew_item.values = data['values']
-                elif data['tag'] == 'พลังงานน้ำ':
-                    hydro_item.values = data['values']
-                elif data['tag'] == 'ถ่านหิน':
-                    coal_item.values = data['values']
-                elif data['tag'] == 'น้ำมัน':
-                    oil_item.values = data['values']
-        elif source == 2:
-            for data in egat_api.get_profile_genMw_group_by_fuel_source2(items.datetime.date()):
-                if  data['tag'] == 'ก๊าซธรรมชาติ':
-                    gas_item.values = data['values']
-                elif data['tag'] == 'พลังงานทดแทน':
-                    renew_item.values = data['values']
-                elif data['tag'] == 'พลังงานน้ำ':
-                    hydro_item.values = data['values']
-                elif data['tag'] == 'ถ่านหิน':
-                    coal_item.values = data['values']
-                elif data['tag'] == 'น้ำมัน':
-                    oil_item.values = data['values']
-        else:
+        if source not in [1, 2]:
             raise HTTPException(status_code=400, detail='soucre should be 1, 2, or 3')
+        async for data in egat_api.get_profile_genMw(profile_date, source=source, group_by='fuel', db=db):
+            if  data['tag'] == 'ก๊าซธรรมชาติ':
+                gas_item.values = data['values']
+            elif data['tag'] == 'พลังงานทดแทน':
+                renew_item.values = data['values']
+            elif data['tag'] == 'พลังงานน้ำ':
+                hydro_item.values = data['values']
+            elif data['tag'] == 'ถ่านหิน':
+                coal_item.values = data['values']
+            elif data['tag'] == 'น้ำมัน':
+                oil_item.values = data['values']
         del data 
         gc.collect()
         
-        datetime_from = gas_item.values[0][0]
-        datetime_to = gas_item.values[-1][0]
-        i = 0
+        # *fuels without generation still get a zero series to add VSPP/IPS to
+        timeline = genmw.half_hour_timestamps(profile_date)
+        fuel_items = [gas_item, renew_item, hydro_item, coal_item, oil_item]
+        for item in fuel_items:
+            if not item.values:
+                item.values = [(dt, 0) for dt in timeline]
+        positions = {item.tag: {dt: i for i, (dt, _) in enumerate(item.values)} for item in fuel_items}
+        datetime_from = timeline[0]
+        datetime_to = timeline[-1]
         renew_list = ['PEA ผลิต', 'ขยะ', 'ชีวภาพ', 'ชีวมวล', 'พพ. ผลิต', 'พลังงานความร้อนเหลือ', 'ลม', 'แสงอาทิตย์']
         gas_list = ['ก๊าซธรรมชาติ', 'co-gen']
-        
-        # *VSPP
-        logger.info('retriveing VSPP')
-        async for fuel, data in crud.get_profile_dummy_data_grouped_by_value_tag(db=db, category='vspp', datetime_from=datetime_from, datetime_to=datetime_to, min_interval=30):
-            if fuel in gas_list:
-                old_dt, old_value = gas_item.values[i]
-                gas_item.values[i]= (old_dt, old_value+data[1])
-                i += 1
-            elif fuel in renew_list:
-                old_dt, old_value = renew_item.values[i]
-                renew_item.values[i]= (old_dt, old_value+data[1])
-                i += 1
-            elif fuel == 'ถ่านหิน':
-                old_dt, old_value = coal_item.values[i]
-                coal_item.values[i]= (old_dt, old_value+data[1])
-                i += 1
-            elif fuel == 'พลังงานน้ำ':
-                old_dt, old_value = hydro_item.values[i]
-                hydro_item.values[i]= (old_dt, old_value+data[1])
-                i += 1
-
-        # *IPS
-        logger.info('retriveing IPS')
-        if is_include_ips:
-            async for fuel, data in crud.get_profile_dummy_data_grouped_by_value_tag(db=db, category='vspp', datetime_from=datetime_from, datetime_to=datetime_to, min_interval=30):
-                if fuel in gas_list:
-                    old_dt, old_value = gas_item.values[i]
-                    gas_item.values[i]= (old_dt, old_value+data[1])
-                    i += 1
-                elif fuel in renew_list:
-                    old_dt, old_value = renew_item.values[i]
-                    renew_item.values[i]= (old_dt, old_value+data[1])
-                    i += 1
-                elif fuel == 'ถ่านหิน':
-                    old_dt, old_value = coal_item.values[i]
-                    coal_item.values[i]= (old_dt, old_value+data[1])
-                    i += 1
-                elif fuel == 'พลังงานน้ำ':
-                    old_dt, old_value = hydro_item.values[i]
-                    hydro_item.values[i]= (old_dt, old_value+data[1])
-                    i += 1
+        value_tag_items = {'ถ่านหิน': coal_item, 'พลังงานน้ำ': hydro_item}
+        value_tag_items.update({fuel: gas_item for fuel in gas_list})
+        value_tag_items.update({fuel: renew_item for fuel in renew_list})
+
+        # *VSPP, IPS
+        categories = ['vspp', 'ips'] if is_include_ips else ['vspp']
+        for category in categories:
+            logger.info(f'retriveing {category.upper()}')
+            async for fuel, (data_timestamp, value) in crud.get_profile_dummy_data_grouped_by_value_tag(db=db, category=category, datetime_from=datetime_from, datetime_to=datetime_to, min_interval=30):
+                item = value_tag_items.get(fuel)
+                if item is None or data_timestamp not in positions[item.tag]:
+                    continue
+                i = positions[item.tag][data_timestamp]
+                old_dt, old_value = item.values[i]
+                item.values[i] = (old_dt, old_value + value)
 
         items.items = [gas_item, coal_item, oil_item, hydro_item, renew_item]
+        __resample_items(items, resolution, aggregation)
     except Exception as e:
         logger.exception(e)
         items.status = 'error'
@@ -403,28 +357,28 @@ async def get_profile_supply_fuel(is_include_ips: Optional[bool] = True, source:
 
 
 @router.get("/profile/demand") #! get profile and update peak that day
-async def get_profile_demand( profile_date: date = date.today(), is_update_peak: bool = True,
-db: AsyncSession = Depends(get_db)) -> Items:
+async def get_profile_demand( profile_date: Optional[date] = None, is_update_peak: bool = True,
+resolution: int = 1, aggregation: str = 'last', db: AsyncSession = Depends(get_db)) -> Items:
+    __check_resolution(resolution, aggregation)
     start_time = runtime()
     items = Items(datetime=datetime.now(), status='ok')
+    profile_date = profile_date or date.today()
     try:
     # *get profile
     # *vspp, Export, 3E
-        data1 = egat_api.get_reqMw(1, profile_date)['list']
-        data2 = egat_api.get_reqMw(2, profile_date)['list']
-        data3 = egat_api.get_reqMw(3, profile_date)['list']
-        data4 = egat_api.get_reqMw(4, profile_date)['list']
-        data5 = egat_api.get_reqMw(5, profile_date)['list']
-        data6 = egat_api.get_reqMw(7, profile_date)['list']
-        data7 = egat_api.get_reqMw(7, profile_date)['list']
-        data12 = egat_api.get_reqMw(12, profile_date)['list']
-        data13 = egat_api.get_reqMw(13, profile_date)['list']
-        data14 = egat_api.get_reqMw(14, profile_date)['list']
-        data15 = egat_api.get_reqMw(15, profile_date)['list']
-        data16 = egat_api.get_reqMw(16, profile_date)['list']
+        async def fetch_customer_direct():
+            return [data async for data in egat_api.get_total_customerDirect(start_date=profile_date, end_date=profile_date, db=db)]
+
+        (reqmw, errors), customer_direct = await asyncio.gather(
+            egat_api.get_reqMw_batch(DEMAND_INDICES, profile_date, db=db),
+            fetch_customer_direct())
+        if errors:
+            raise HTTPException(status_code=500, detail=f'reqMw failed for indices {list(errors)}')
+        profiles = [reqmw[index]['list'] for index in DEMAND_INDICES]
+        data1 = profiles[0]
 
         data_timestamp = datetime.combine(profile_date, time(0, 0))
-        get_customerDirect = iter(egat_api.get_total_customerDirect(start_date=profile_date, end_date=profile_date))
+        get_customerDirect = iter(customer_direct)
         value_customerDirect = 0
         item = TimeseriesItem(tag='actual')
         peak_value = 0
@@ -450,18 +404,8 @@ db: AsyncSession = Depends(get_db)) -> Items:
             except StopIteration:
                 pass  # Keep previous value_customerDirect as is
             
-            value += data1[i][-1]
-            value += data2[i][-1]
-            value += data3[i][-1]
-            value += data4[i][-1]
-            value += data5[i][-1]
-            value += data6[i][-1]
-            value += data7[i][-1]
-            value += data12[i][-1]
-            value += data13[i][-1]
-            value += data14[i][-1]
-            value += data15[i][-1]
-            value += data16[i][-1]
+            for profile in profiles:
+                value += profile[i][-1]
             value += value_customerDirect
             value = round(value, 4)
             # *define peak
@@ -473,6 +417,8 @@ db: AsyncSession = Depends(get_db)) -> Items:
 
 
         items.items = [item]
+        # *the peak above is taken from the full per-minute series
+        __resample_items(items, resolution, aggregation)
     
     # *updaet peak acording peak date
         if is_update_peak:
@@ -515,8 +461,9 @@ async def get_summary_peak(db: AsyncSession = Depends(get_db)):
     )
 
 @router.get("/cont/project/renew")
-async def get_count_project_renew(db: AsyncSession = Depends(get_db)) -> Items:
+async def get_count_project_renew(metric: str = 'count', db: AsyncSession = Depends(get_db)) -> Items:
     start_time = runtime()
+    __check_project_metric(metric)
     items = Items(datetime=datetime.now(), status='ok')
 
     fuel_map_th = {
@@ -530,20 +477,15 @@ async def get_count_project_renew(db: AsyncSession = Depends(get_db)) -> Items:
         'RE - Others': 'อื่นๆ',
         'N/A': 'ไม่ระบุบ',
     }
-    total_count = 0
-    for fuel_en in fuel_map_th.keys():
-        count = await crud.count_active_projects_by_fuel(db=db, fuel=fuel_en, fuel_type='renew')
-        total_count += count
-        items.items.append(Item(
-            tag=fuel_map_th[fuel_en], value=count
-        ))
-    items.items.append(Item(tag='total',value=total_count))
+    stats = await crud.get_project_fuel_stats(db=db)
+    items.items = __project_fuel_items(stats, 'Renewable', fuel_map_th, metric)
     logger.info(f'runtime: {runtime() - start_time:3f} s')
     return items
 
 @router.get("/cont/project/fossil")
-async def get_count_project_fossil(db: AsyncSession = Depends(get_db)) -> Items:
+async def get_count_project_fossil(metric: str = 'count', db: AsyncSession = Depends(get_db)) -> Items:
     start_time = runtime()
+    __check_project_metric(metric)
     items = Items(datetime=datetime.now(), status='ok')
 
     fuel_map_th = {
@@ -554,14 +496,8 @@ async def get_count_project_fossil(db: AsyncSession = Depends(get_db)) -> Items:
         'Lignite': 'ถ่านหินลิกไนต์',
         'Coal': 'ถ่านหิน',
     }
-    total_count = 0
-    for fuel_en in fuel_map_th.keys():
-        count = await crud.count_active_projects_by_fuel(db=db, fuel=fuel_en, fuel_type='fossil')
-        total_count += count
-        items.items.append(Item(
-            tag=fuel_map_th[fuel_en], value=count
-        ))
-    items.items.append(Item(tag='total',value=total_count))
+    stats = await crud.get_project_fuel_stats(db=db)
+    items.items = __project_fuel_items(stats, 'Fossil', fuel_map_th, metric)
     logger.info(f'runtime: {runtime() - start_time:3f} s')
     return items
 
@@ -578,10 +514,24 @@ async def get__project_location_by_fuel(db: AsyncSession = Depends(get_db)) -> I
     logger.info(f'runtime: {runtime() - start_time:3f} s')
     return items
 
+@router.get("/project/location/cluster")
+async def get_project_location_cluster(zoom: int, south: float, west: float, north: float, east: float, db: AsyncSession = Depends(get_db)) -> Items:
+    start_time = runtime()
+    if zoom < 0 or south > north or west > east:
+        raise HTTPException(status_code=400, detail='zoom should be >= 0 and the box south <= north, west <= east')
+    items = Items(datetime=datetime.now(), status='ok')
+    try:
+        clusters = await crud.get_project_clusters(db=db)
+        items.items = [ClusterItem(**cluster) for cluster in clusters.query(zoom, south, west, north, east)]
+    except Exception as e:
+        items.status = 'error'
+        logger.exception(e)
+    logger.info(f'runtime: {runtime() - start_time:3f} s')
+    return items
+
 @router.post("/submit/dummy")
 async def submit_dummy_data(title: str,
-                            file: UploadFile = File(...),
-                            db: AsyncSession = Depends(get_db)):
+                            file: UploadFile = File(...)) -> JobMsg:
     start_time = runtime()
     submit_timestamp = datetime.now()
 
@@ -592,61 +542,51 @@ async def submit_dummy_data(title: str,
             status_code=400,
             detail=f'tile is not valid. valid list {valid_titles}')
 
-    # *file validation
-    try:
-        content = await file.read()
-        decoded = content.decode("utf-8-sig")
-        csv_reader = csv.DictReader(StringIO(decoded))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f'invalidate file')
-
-    REQUIRED_COLUMNS = {'DTM', 'ZONE', 'PROVINCE', 'TYPE', 'VALDUMMY'}
-    actual_columns = set(csv_reader.fieldnames or [])
-    logger.debug(actual_columns)
-    missing = REQUIRED_COLUMNS - actual_columns
-    if missing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Missing required columns: {', '.join(missing)}")
-    # Data Process rows (example: collect to return)
-    error_logs = []
-    processed_count = 0
-    csv_reader = list(csv.DictReader(StringIO(decoded)))
-    total_count = len(csv_reader)
-
-    for row in csv_reader:
-        try:
-            data = schemas.DummyDataCreate(
-                submit_timestamp=submit_timestamp,
-                data_timestamp=datetime.fromisoformat(row['DTM']),
-                category=title,
-                zone=row['ZONE'],
-                province=row['PROVINCE'],
-                value_tag=row['TYPE'],
-                value=float(row['VALDUMMY']))
-            await crud.create_dummy_data(db, data)
-
-        except Exception as e:
-            msg = f'{e}, data:{row}'
-            logger.error(msg)
-            error_logs.append(msg)
-        processed_count += 1
-        logger.info(
-            f"Processed {processed_count} / {total_count} records for title='{title}'"
-        )
+    # *file validation, the rows are ingested by a background job
+    await ingest.open_csv(file, DUMMY_COLUMNS)
+    job = await jobs.submit('dummy', file, lambda job: __ingest_dummy_data(job, title, submit_timestamp))
 
     logger.info(f'runtime: {runtime() - start_time:3f} s')
-
-    if len(error_logs) == 0:
-        return Msg(status='ok', message='insert without error')
-    else:
-        return Msg(status='error',
-                           message=f'errors: {"\n".join(error_logs) }')
+    return JobMsg(status='accepted', message=f'job {job.id} queued', job_id=job.id)
+
+async def __ingest_dummy_data(job: jobs.Job, title: str, submit_timestamp: datetime):
+    upload = job.open_upload()
+    async with async_session() as db:
+        # *the file is read once into a staging table, then the monthly
+        # *partitions it needs are created in a short transaction of their
+        # *own before the staged rows move into electricDummyData. The rows
+        # *and the latest-submission table are committed together
+        try:
+            months = set()
+            stream = await ingest.open_csv(upload, DUMMY_COLUMNS)
+            async for rows in stream.batches():
+                records = []
+                for row in rows:
+                    try:
+                        data_timestamp = datetime.fromisoformat(row['DTM'])
+                        records.append((submit_timestamp, data_timestamp, title, row['ZONE'], row['PROVINCE'], row['TYPE'], float(row['VALDUMMY'])))
+                    except Exception as e:
+                        msg = f'{e}, data:{row}'
+                        logger.error(msg)
+                        job.errors.append(msg)
+                await crud.copy_dummy_data(db, records)
+                months.update(record[1].date() for record in records)
+                job.rows, job.bytes_read = stream.rows, stream.bytes
+                job.written += len(records)
+            async with async_session() as ddl:
+                await crud.ensure_dummy_data_partitions(ddl, months)
+            await crud.merge_dummy_data(db)
+            await crud.refresh_dummy_data_latest(db, category=title, submit_timestamp=submit_timestamp)
+        except Exception:
+            await db.rollback()
+            job.written = 0
+            raise
+        finally:
+            await upload.close()
 
 @router.post("/submit/peak")
 async def submit_peak(title: str,
-                            file: UploadFile = File(...),
-                            db: AsyncSession = Depends(get_db)):
+                            file: UploadFile = File(...)) -> JobMsg:
     start_time = runtime()
 
     # *category validation
@@ -656,58 +596,44 @@ async def submit_peak(title: str,
             status_code=400,
             detail=f'tile is not valid. valid list {valid_titles}')
 
-    # *file validation
-    try:
-        content = await file.read()
-        decoded = content.decode("utf-8-sig")
-        csv_reader = csv.DictReader(StringIO(decoded))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f'invalidate file')
-
-    REQUIRED_COLUMNS = {'Time', 'Value'}
-    actual_columns = set(csv_reader.fieldnames or [])
-    logger.debug(actual_columns)
-    missing = REQUIRED_COLUMNS - actual_columns
-    if missing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Missing required columns: {', '.join(missing)}")
-    # Data Process rows (example: collect to return)
-    error_logs = []
-    processed_count = 0
-    csv_reader = list(csv.DictReader(StringIO(decoded)))
-    total_count = len(csv_reader)
-
-    for row in csv_reader:
-        try:
-            data_timestamp = datetime.fromisoformat(row['Time'])
-            data = schemas.PeakDayCreate(
-                peak_date=data_timestamp.date(),
-                peak_datetime=data_timestamp,
-                peak_type=title,
-                value=float(row['Value']))
-            await crud.upsert_peak(db, data)
-
-        except Exception as e:
-            msg = f'{e}, data:{row}'
-            logger.error(msg)
-            error_logs.append(msg)
-        processed_count += 1
-        logger.info(
-            f"Processed {processed_count} / {total_count} records for title='{title}'"
-        )
+    # *file validation, the rows are ingested by a background job
+    await ingest.open_csv(file, PEAK_COLUMNS)
+    job = await jobs.submit('peak', file, lambda job: __ingest_peak(job, title))
 
     logger.info(f'runtime: {runtime() - start_time:3f} s')
+    return JobMsg(status='accepted', message=f'job {job.id} queued', job_id=job.id)
 
-    if len(error_logs) == 0:
-        return Msg(status='ok', message='insert without error')
-    else:
-        return Msg(status='error',
-                           message=f'errors: {"\n".join(error_logs) }')
+async def __ingest_peak(job: jobs.Job, title: str):
+    upload = job.open_upload()
+    async with async_session() as db:
+        # *every batch is committed on its own
+        try:
+            stream = await ingest.open_csv(upload, PEAK_COLUMNS)
+            async for rows in stream.batches():
+                peaks = []
+                for row in rows:
+                    try:
+                        data_timestamp = datetime.fromisoformat(row['Time'])
+                        peaks.append(schemas.PeakDayCreate(
+                            peak_date=data_timestamp.date(),
+                            peak_datetime=data_timestamp,
+                            peak_type=title,
+                            value=float(row['Value'])))
+                    except Exception as e:
+                        msg = f'{e}, data:{row}'
+                        logger.error(msg)
+                        job.errors.append(msg)
+                await crud.upsert_peaks(db, peaks)
+                job.rows, job.bytes_read = stream.rows, stream.bytes
+                job.written += len(peaks)
+        except Exception:
+            await db.rollback()
+            raise
+        finally:
+            await upload.close()
 
 @router.post("/submit/project")
-async def submit_project_data(file: UploadFile = File(...),
-                              db: AsyncSession = Depends(get_db)):
+async def submit_project_data(file: UploadFile = File(...)) -> JobMsg:
     start_time = runtime()
     submit_timestamp = datetime.now()
 
@@ -715,96 +641,61 @@ async def submit_project_data(file: UploadFile = File(...),
         raise HTTPException(status_code=400,
                             detail="Only Excel files are supported")
 
-    try:
-        content = await file.read()
-        workbook = load_workbook(filename=BytesIO(content), data_only=True)
-        sheet = workbook.active
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid Excel file: {e}")
+    # *the workbook is parsed and written by a background job
+    job = await jobs.submit('project', file, lambda job: __ingest_projects(job, submit_timestamp))
 
-    headers = [
-        cell.value for cell in next(sheet.iter_rows(min_row=1, max_row=1))
-    ]
-    header_index = {h: i for i, h in enumerate(headers)}
+    logger.info(f'runtime: {runtime() - start_time:3f} s')
+    return JobMsg(status='accepted', message=f'job {job.id} queued', job_id=job.id)
+
+async def __ingest_projects(job: jobs.Job, submit_timestamp: datetime):
+    # *the workbook is parsed in a worker process, off the event loop
+    rows, job.errors = await workers.run(project_sheet.parse_project_sheet,
+                                         job.path, submit_timestamp,
+                                         settings.UPLOAD_MAX_ERRORS)
+    job.rows, job.bytes_read = len(rows) + len(job.errors), job.bytes_total
+    for msg in job.errors.messages:
+        logger.error(msg)
+
+    # *only projects whose content changed since the last upload are written
+    async with async_session() as db:
+        try:
+            for start in range(0, len(rows), settings.INGEST_BATCH_SIZE):
+                job.written += await crud.upsert_project_rows(
+                    db, rows[start:start + settings.INGEST_BATCH_SIZE])
+            # *precompute the map clusters for the new registry
+            if job.written:
+                await crud.build_project_clusters(db)
+        except Exception:
+            await db.rollback()
+            raise
+    logger.info(f'{job.written} of {len(rows)} projects changed')
 
-    processed_count = 0
-    error_logs = []
 
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        data = {h: row[header_index[h]] for h in headers}
-        try:
-            project = schemas.ProjectCreate(
-                g_project_key=str(data.get("G_PROJECT_KEY") or ""),
-                spp_vspp_rowid=str(data.get("SPP_VSPP_ROWID") or ""),
-                e_license_rowid=str(data.get("E_LICENSE_ROWID") or ""),
-                pk_powersystemresource=str(
-                    data.get("PK_POWERSYSTEMRESOURCE") or ""),
-                erc_cd=str(data.get("ERC_CD") or ""),
-                org=data.get("ORG"),
-                spp_vspp_plant_cd=data.get("SPP_VSPP_PLANT_CD"),
-                ppa_contract_no=data.get("PPA_CONTRACT_NO"),
-                project_name=data.get("PROJECT_NAME"),
-                spp_vspp_project_name=data.get("SPP_VSPP_PROJECT_NAME"),
-                licensee=data.get("LICENSEE"),
-                display_addr=data.get("DISPLAY_ADDR"),
-                subdistrict=data.get("SUBDISTRICT"),
-                district=data.get("DISTRICT"),
-                province=data.get("PROVINCE"),
-                country_zone=data.get("COUNTRY_ZONE"),
-                egat_zone=data.get("EGAT_ZONE"),
-                contract_status=data.get("CONTRACT_STATUS"),
-                e_license_instl_mw=data.get("E_LICENSE_INSTL_MW"),
-                e_license_instl_kva=data.get("E_LICENSE_INSTL_KVA"),
-                installed_cap_mw=data.get("INSTALLED_CAP_MW"),
-                contracted_cap_mw=data.get("CONTRACTED_CAP_MW"),
-                project_type=data.get("PROJECT_TYPE"),
-                contract_type=data.get("CONTRACT_TYPE"),
-                technology_a_group_1=data.get("TECHNOLOGY_A_GROUP_1"),
-                technology_a_group_2=data.get("TECHNOLOGY_A_GROUP_2"),
-                technology_a_detail=data.get("TECHNOLOGY_A_DETAIL"),
-                primary_fuel_a_group_1=data.get("PRIMARY_FUEL_A_GROUP_1"),
-                primary_fuel_a_group_2=data.get("PRIMARY_FUEL_A_GROUP_2"),
-                primary_fuel_a_group_3=data.get("PRIMARY_FUEL_A_GROUP_3"),
-                secondary_fuel_a_group_1=data.get("SECONDARY_FUEL_A_GROUP_1"),
-                secondary_fuel_a_group_2=data.get("SECONDARY_FUEL_A_GROUP_2"),
-                secondary_fuel_a_group_3=data.get("SECONDARY_FUEL_A_GROUP_3"),
-                technology_b_group_1=data.get("TECHNOLOGY_B_GROUP_1"),
-                technology_b_group_2=data.get("TECHNOLOGY_B_GROUP_2"),
-                technology_b_detail=data.get("TECHNOLOGY_B_DETAIL"),
-                primary_fuel_b_group_1=data.get("PRIMARY_FUEL_B_GROUP_1"),
-                primary_fuel_b_group_2=data.get("PRIMARY_FUEL_B_GROUP_2"),
-                primary_fuel_b_group_3=data.get("PRIMARY_FUEL_B_GROUP_3"),
-                secondary_fuel_b_group_1=data.get("SECONDARY_FUEL_B_GROUP_1"),
-                secondary_fuel_b_group_2=data.get("SECONDARY_FUEL_B_GROUP_2"),
-                secondary_fuel_b_group_3=data.get("SECONDARY_FUEL_B_GROUP_3"),
-                utilization=data.get("UTILIZATION"),
-                scod=data.get("SCOD"),
-                cod=data.get("COD"),
-                lat=data.get("LAT"),
-                lng=data.get("LNG"),
-                is_egat_sys_gen=(str(data.get("IS_EGAT_SYS_GEN")) == '1'),
-                is_sharing_lic=(str(data.get("IS_SHARING_LIC")) == '1'),
-                licensingno=data.get("LICENSINGNO"),
-                erc_district_no=str(data.get("ERC_DISTRICT_NO") or ""),
-                erc_district_displayname=data.get("ERC_DISTRICT_DISPLAYNAME"),
-                month_key=str(data.get("MONTH_KEY") or ""),
-                update_timestamp=submit_timestamp)
-            await crud.upsert_project(db, project)
-        except Exception as e:
-            if db.in_transaction():
-                await db.rollback()
-            error_logs.append(f"{e}, data: {data}")
-            logger.error(f"{e}, data: {data}")
-        processed_count += 1
-        logger.info(f"Processed {processed_count} / {sheet.max_row - 1}")
+def __check_project_metric(metric: str):
+    if metric not in crud.PROJECT_METRICS:
+        raise HTTPException(status_code=400, detail=f'metric should be one of {crud.PROJECT_METRICS}')
 
-    logger.info(f'runtime: {runtime() - start_time:3f} s')
-    
-    if len(error_logs) == 0:
-        return Msg(status='ok', message='insert without error')
-    else:
-        return Msg(
-            status='error',
-            message=f'errors: {len(error_logs)} records failed.')
+
+def __project_fuel_items(stats: dict, fuel_group: str, fuel_map_th: dict, metric: str) -> list[Item]:
+    # *one item per fuel of fuel_map_th, in its order, then the total
+    items = []
+    total = 0
+    for fuel_en, fuel_th in fuel_map_th.items():
+        value = stats.get((fuel_group, fuel_en), {}).get(metric, 0)
+        total += value
+        items.append(Item(tag=fuel_th, value=value))
+    items.append(Item(tag='total', value=total))
+    return items
+
+
+def __check_resolution(resolution: int, aggregation: str):
+    if resolution not in resample.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f'resolution should be one of {resample.RESOLUTIONS}')
+    if aggregation not in resample.AGGREGATIONS:
+        raise HTTPException(status_code=400, detail=f'aggregation should be one of {resample.AGGREGATIONS}')
 
 
+def __resample_items(items: Items, resolution: int, aggregation: str):
+    # *coarser buckets for charts, finer than the source data is a no-op
+    for item in items.items:
+        item.values = resample.resample_timeseries(item.values, resolution, aggregation)
@@ -0,0 +1,15 @@
+import logging
+from fastapi import APIRouter, HTTPException
+from app.core import jobs
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'job {job_id} not found')
+    return job.stats()
@@ -1,16 +1,15 @@
 import logging
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date, timedelta, time
 from fastapi import APIRouter, UploadFile, File, Depends
 from app.crud import natural_gas as crud
 from app.crud import tso_api, pttlng_api
 from app.db.session import get_db
+from app.core import snapshot, ingest
 from app.schemas import natural_gas as schemas
-from app.schemas.utils import Items, ItemWithPercent, ItemWithMax, Msg, DateseriesItem
+from app.schemas.utils import Items, ItemWithPercent, ItemWithMax, Msg, DateseriesItem, TimeseriesItem
 from time import time as runtime
-from fastapi import HTTPException
-from io import StringIO
-import csv
 
 router = APIRouter()
 
@@ -23,6 +22,12 @@ MAX_INVENT_GMPT = 0
 
 @router.get("/current/supply/mmsdfd")
 async def get_current_supply_mmscfd() -> Items:
+    # *served from the poller snapshot while it is fresh
+    return await snapshot.get_or_build(
+        'natural-gas/current/supply/mmsdfd', lambda: build_current_supply_mmscfd())
+
+
+async def build_current_supply_mmscfd() -> Items:
     start_time = runtime()
     items = Items(datetime=datetime.now(), status='ok')
     total_item = ItemWithPercent(tag='total', percent=100)
@@ -31,7 +36,7 @@ async def get_current_supply_mmscfd() -> Items:
     myanmar_item = ItemWithPercent(tag='myanmar')
     onshore_item = ItemWithPercent(tag='onshore')
 
-    for record in tso_api.get_current_supply_mmscfd():
+    async for record in tso_api.get_current_supply_mmscfd():
         total_item.value += record['value']
         if record['tag'] == 'got':
             got_item.value += record['value']
@@ -54,6 +59,12 @@ async def get_current_supply_mmscfd() -> Items:
 
 @router.get("/current/demand/mmsdfd")
 async def get_current_demand_mmscfd() -> Items:
+    # *served from the poller snapshot while it is fresh
+    return await snapshot.get_or_build(
+        'natural-gas/current/demand/mmsdfd', lambda: build_current_demand_mmscfd())
+
+
+async def build_current_demand_mmscfd() -> Items:
     start_time = runtime()
     items = Items(datetime=datetime.now(), status='ok')
     total_item = ItemWithPercent(tag='total', percent=100)
@@ -65,7 +76,7 @@ async def get_current_demand_mmscfd() -> Items:
     ngv_item = ItemWithPercent(tag='ngv')
     fuel_item = ItemWithPercent(tag='fuel')
 
-    for record in tso_api.get_current_demand_mmscfd():
+    async for record in tso_api.get_current_demand_mmscfd():
         total_item.value += record['value']
         if record['tag'] == 'egat':
             egat_item.value += record['value']
@@ -102,13 +113,19 @@ async def get_current_demand_mmscfd() -> Items:
 @router.get("/current/lng/invent/m3")
 async def get_current_lng_invent_m3(db: AsyncSession = Depends(
     get_db)) -> Items:
+    # *served from the poller snapshot while it is fresh
+    return await snapshot.get_or_build(
+        'natural-gas/current/lng/invent/m3', lambda: build_current_lng_invent_m3(db=db))
+
+
+async def build_current_lng_invent_m3(db: AsyncSession) -> Items:
     start_time = runtime()
     items = Items(datetime=datetime.now(), status='ok')
     lmpt1_item = ItemWithMax(tag='lmpt1', max=MAX_INVENT_LMPT1)
     lmpt2_item = ItemWithMax(tag='lmpt2', value=0, max=MAX_INVENT_LMPT2)
     gmtp_item = ItemWithMax(tag='gmpt', value=0, max=MAX_INVENT_GMPT)
 
-    data = pttlng_api.get_current_lmpt1_invent()
+    data = await pttlng_api.get_current_lmpt1_invent()
     items.datetime = data['timestamp']
     lmpt1_item.value = data['value']
 
@@ -123,18 +140,41 @@ async def get_current_lng_invent_m3(db: AsyncSession = Depends(
     items.items = [lmpt1_item, lmpt2_item, gmtp_item]
     logger.info(f'runtime: {runtime() - start_time:3f} s')
 
-    await crud.upsert_eod_value(db=db,
-                                item=schemas.EodValueCreate(
-                                    date=date.today(),
-                                    tag='lmpt1_invent',
-                                    value=lmpt1_item.value,
-                                    update_timestamp=datetime.now()))
-    await crud.upsert_eod_value(db=db,
-                                item=schemas.EodValueCreate(
-                                    date=date.today(),
-                                    tag='lmpt2_invent',
-                                    value=lmpt2_item.value,
-                                    update_timestamp=datetime.now()))
+    update_timestamp = datetime.now()
+    await crud.upsert_eod_values(db=db,
+                                 items=[
+                                     schemas.EodValueCreate(
+                                         date=date.today(),
+                                         tag=item.tag + '_invent',
+                                         value=item.value,
+                                         update_timestamp=update_timestamp)
+                                     for item in (lmpt1_item, lmpt2_item)
+                                 ])
+    return items
+
+
+@router.get("/profile/lng/lmpt2/invent/m3")
+async def get_profile_lmpt2_invent_m3(gas_day: Optional[date] = None,
+                                      db: AsyncSession = Depends(
+                                          get_db)) -> Items:
+    start_time = runtime()
+    gas_day = gas_day or date.today()
+    items = Items(datetime=datetime.now(), status='ok')
+    total_item = TimeseriesItem(tag='total')
+    tank1_item = TimeseriesItem(tag='tank1')
+    tank2_item = TimeseriesItem(tag='tank2')
+
+    profile = await pttlng_api.get_lmpt2_invent_profile(db=db,
+                                                        gas_day=gas_day)
+    for timestamp, tank1, tank2 in profile:
+        total_item.values.append((timestamp, tank1 + tank2))
+        tank1_item.values.append((timestamp, tank1))
+        tank2_item.values.append((timestamp, tank2))
+    if profile:
+        items.datetime = profile[-1][0]
+
+    items.items = [total_item, tank1_item, tank2_item]
+    logger.info(f'runtime: {runtime() - start_time:3f} s')
     return items
 
 
@@ -199,38 +239,36 @@ async def update_lng_sendout_invent(start_date: date = date.today(),
                                           microsecond=0)
     date_process -= timedelta(days=1)
     count = days_back
+    eod_values = []
     while count > 0:
         logger.info(f'processing {date_process.date().strftime("%Y-%m-%d")}')
         lmpt1_invent = 0
         try:
-            for data in tso_api.get_lng_sendout_invent(date_process):
+            async for data in tso_api.get_lng_sendout_invent(date_process):
                 logger.debug(f'tso response: {data}')
                 if data['tag'] in ['lmpt1_sendout', 'lmpt1_sendout']:
-                    await crud.upsert_eod_value(
-                        db=db,
-                        item=schemas.EodValueCreate(
+                    eod_values.append(
+                        schemas.EodValueCreate(
                             tag=data['tag'],
                             date=date_process.date(),
                             value=data['value'],
                             update_timestamp=datetime.now()))
                 elif data['tag'] == 'lmpt1_invent':
                     lmpt1_invent += data['value']
-            await crud.upsert_eod_value(db=db,
-                                        item=schemas.EodValueCreate(
-                                            tag='lmpt1_invent',
-                                            date=date_process.date(),
-                                            value=lmpt1_invent,
-                                            update_timestamp=datetime.now()))
+            eod_values.append(
+                schemas.EodValueCreate(tag='lmpt1_invent',
+                                       date=date_process.date(),
+                                       value=lmpt1_invent,
+                                       update_timestamp=datetime.now()))
 
             data = await pttlng_api.get_eod_lmpt2_invent(
                 db, date_process.date())
             logger.debug(f'pttlng response: {data}')
-            await crud.upsert_eod_value(db=db,
-                                        item=schemas.EodValueCreate(
-                                            tag='lmpt2_invent',
-                                            date=date_process.date(),
-                                            value=data['value'],
-                                            update_timestamp=datetime.now()))
+            eod_values.append(
+                schemas.EodValueCreate(tag='lmpt2_invent',
+                                       date=date_process.date(),
+                                       value=data['value'],
+                                       update_timestamp=datetime.now()))
 
             count -= 1
             date_process -= timedelta(days=1)
@@ -238,6 +276,9 @@ async def update_lng_sendout_invent(start_date: date = date.today(),
             logger.error(e)
             count = 0
 
+    # *days fetched before a failure are still saved, in one statement
+    await crud.upsert_eod_values(db=db, items=eod_values)
+
     logger.info(f'runtime: {runtime() - start_time:3f} s')
     return msg
 
@@ -248,54 +289,46 @@ async def submit_lng_tank_table(file: UploadFile = File(...),
     start_time = runtime()
 
     # *file validation
-    try:
-        content = await file.read()
-        decoded = content.decode("utf-8-sig")
-        csv_reader = csv.DictReader(StringIO(decoded))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f'invalidate file')
-
     REQUIRED_COLUMNS = {'level_cm', 'lmpt2_tank1_m3', 'lmpt2_tank2_m3'}
-    actual_columns = set(csv_reader.fieldnames or [])
-    logger.debug(actual_columns)
-    missing = REQUIRED_COLUMNS - actual_columns
-    if missing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Missing required columns: {', '.join(missing)}")
+    stream = await ingest.open_csv(file, REQUIRED_COLUMNS)
     # Data Process rows (example: collect to return)
-    error_logs = []
-    processed_count = 0
-    csv_reader = list(csv.DictReader(StringIO(decoded)))
-    total_count = len(csv_reader)
-
-    for row in csv_reader:
-        try:
-            try:
-                tank1 = float(row['lmpt2_tank1_m3'])
-            except:
-                tank1 = None
-            try:
-                tank2 = float(row['lmpt2_tank2_m3'])
-            except:
-                tank2 = None
-            data = schemas.TankTableCreate(level_cm=int(row['level_cm']),
-                                           lmpt2_tank1_m3=tank1,
-                                           lmpt2_tank2_m3=tank2)
-            await crud.upsert_tank_table(db, data)
-        except Exception as e:
-            msg = f'{e}, data:{row}'
-            logger.error(msg)
-            error_logs.append(msg)
-        processed_count += 1
-        logger.info(f"Processed {processed_count} / {total_count} records")
+    error_logs = ingest.ErrorLog()
+    try:
+        async for rows in stream.batches():
+            tank_levels = []
+            for row in rows:
+                try:
+                    try:
+                        tank1 = float(row['lmpt2_tank1_m3'])
+                    except:
+                        tank1 = None
+                    try:
+                        tank2 = float(row['lmpt2_tank2_m3'])
+                    except:
+                        tank2 = None
+                    tank_levels.append(
+                        schemas.TankTableCreate(level_cm=int(row['level_cm']),
+                                                lmpt2_tank1_m3=tank1,
+                                                lmpt2_tank2_m3=tank2))
+                except Exception as e:
+                    msg = f'{e}, data:{row}'
+                    logger.error(msg)
+                    error_logs.append(msg)
+            await crud.upsert_tank_tables(db, tank_levels)
+        logger.info(f'{stream.rows} rows')
+    except Exception as e:
+        await db.rollback()
+        logger.exception(e)
+        error_logs.append(f'bulk upsert failed: {e}')
 
+    # *inventory lookups read the in-memory copy, refresh it
+    await crud.load_tank_table(db)
     logger.info(f'runtime: {runtime() - start_time:3f} s')
 
     if len(error_logs) == 0:
         return Msg(status='ok', message='insert without error')
     else:
-        return Msg(status='error', message=f'errors: {"\n".join(error_logs) }')
+        return Msg(status='error', message=f'errors: {error_logs}')
 
 
 @router.post("/submit/eod/value")
@@ -305,45 +338,35 @@ async def submit_eod_value(file: UploadFile = File(...),
     dt = datetime.now()
 
     # *file validation
-    try:
-        content = await file.read()
-        decoded = content.decode("utf-8-sig")
-        csv_reader = csv.DictReader(StringIO(decoded))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f'invalidate file')
-
     REQUIRED_COLUMNS = {'tag', 'date', 'value'}
-    actual_columns = set(csv_reader.fieldnames or [])
-    logger.debug(actual_columns)
-    missing = REQUIRED_COLUMNS - actual_columns
-    if missing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Missing required columns: {', '.join(missing)}")
+    stream = await ingest.open_csv(file, REQUIRED_COLUMNS)
     # Data Process rows (example: collect to return)
-    error_logs = []
-    processed_count = 0
-    csv_reader = list(csv.DictReader(StringIO(decoded)))
-    total_count = len(csv_reader)
-
-    for row in csv_reader:
-        try:
-            data = schemas.EodValueCreate(tag=row['tag'],
-                                          date=datetime.strptime(
-                                              row['date'], "%d-%m-%Y").date(),
-                                          value=float(row['value']),
-                                          update_timestamp=dt)
-            await crud.upsert_eod_value(db, data)
-        except Exception as e:
-            msg = f'{e}, data:{row}'
-            logger.error(msg)
-            error_logs.append(msg)
-        processed_count += 1
-        logger.info(f"Processed {processed_count} / {total_count} records")
+    error_logs = ingest.ErrorLog()
+    try:
+        async for rows in stream.batches():
+            records = []
+            # *line numbers keep file order for the merge
+            for line, row in enumerate(rows, start=stream.rows - len(rows)):
+                try:
+                    if len(row['tag']) > 32:
+                        raise ValueError('tag is longer than 32 characters')
+                    records.append((line, datetime.strptime(row['date'], "%d-%m-%Y").date(),
+                                    row['tag'], float(row['value']), dt))
+                except Exception as e:
+                    msg = f'{e}, data:{row}'
+                    logger.error(msg)
+                    error_logs.append(msg)
+            await crud.copy_eod_values(db, records)
+        logger.info(f'{stream.rows} rows')
+        await crud.merge_eod_values(db)
+    except Exception as e:
+        await db.rollback()
+        logger.exception(e)
+        error_logs.append(f'bulk insert failed: {e}')
 
     logger.info(f'runtime: {runtime() - start_time:3f} s')
 
     if len(error_logs) == 0:
         return Msg(status='ok', message='insert without error')
     else:
-        return Msg(status='error', message=f'errors: {"\n".join(error_logs) }')
+        return Msg(status='error', message=f'errors: {error_logs}')
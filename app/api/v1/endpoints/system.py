@@ -0,0 +1,28 @@
+import logging
+from datetime import datetime
+from fastapi import APIRouter
+from app.core import http_client, snapshot, jobs
+from app.crud import egat_api
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/upstream")
+async def get_upstream_status():
+    return {
+        'datetime': datetime.now(),
+        'status': 'ok',
+        'coalescing': http_client.flight.stats(),
+        'cache': {
+            'reqmw': egat_api.reqmw_cache.stats(),
+            'gen_day': egat_api.gen_day_cache.stats()
+        },
+        'snapshots': snapshot.stats(),
+        'breakers': {
+            host: breaker.stats()
+            for host, breaker in http_client.breakers.items()
+        },
+        'jobs': jobs.stats()
+    }
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from time import time
+from app.core import snapshot
+from app.core.config import settings
+from app.db.session import async_session
+from app.api.v1.endpoints import electric, natural_gas
+
+logger = logging.getLogger(__name__)
+
+_tasks: list[asyncio.Task] = []
+
+
+def __jobs() -> list:
+    # *(snapshot name, builder, cadence in seconds)
+    return [
+        ('electric/current/supply', lambda db: electric.build_current_supply(
+            is_include_ips=True, source=1, db=db),
+         settings.POLL_INTERVAL_ELECTRIC),
+        ('electric/current/demand', lambda db: electric.build_current_demand(
+            is_include_ips=False, db=db), settings.POLL_INTERVAL_ELECTRIC),
+        ('natural-gas/current/supply/mmsdfd',
+         lambda db: natural_gas.build_current_supply_mmscfd(),
+         settings.POLL_INTERVAL_GAS),
+        ('natural-gas/current/demand/mmsdfd',
+         lambda db: natural_gas.build_current_demand_mmscfd(),
+         settings.POLL_INTERVAL_GAS),
+        ('natural-gas/current/lng/invent/m3',
+         lambda db: natural_gas.build_current_lng_invent_m3(db=db),
+         settings.POLL_INTERVAL_LNG),
+    ]
+
+
+async def __poll(name: str, build, interval: int):
+    while True:
+        try:
+            async with async_session() as db:
+                items = await build(db)
+            if items.status == 'ok':
+                # *a snapshot missing two polls in a row is no longer served
+                snapshot.put(name, items, max_age=interval * 2)
+            else:
+                logger.warning(f'poll {name} returned status {items.status}')
+        except Exception as e:
+            logger.error(f'poll {name} failed')
+            logger.exception(e)
+        await asyncio.sleep(__seconds_to_next(interval))
+
+
+def __seconds_to_next(interval: int) -> float:
+    # *wake up just after the next cadence boundary, when upstream has
+    # *published the new value
+    return interval - time() % interval + settings.POLL_LAG
+
+
+def start():
+    if not settings.POLLER_ENABLED:
+        logger.info('poller disabled')
+        return
+    for name, build, interval in __jobs():
+        logger.info(f'polling {name} every {interval} s')
+        _tasks.append(
+            asyncio.create_task(__poll(name, build, interval),
+                                name=f'poll {name}'))
+
+
+async def stop():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
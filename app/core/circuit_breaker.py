@@ -0,0 +1,73 @@
+import logging
+from datetime import datetime
+from time import monotonic
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    # *closed: calls pass, consecutive failures are counted
+    # *open: calls fail fast until reset_timeout has passed
+    # *half_open: one probe call decides between closed and open
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int,
+                 reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_failure = None
+        self._opened_monotonic = 0.0
+        self._probing = False
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            if monotonic() - self._opened_monotonic < self.reset_timeout:
+                raise CircuitOpenError(f'{self.name} circuit is open')
+            logger.info(f'{self.name} circuit half-open, probing')
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(f'{self.name} circuit is half-open')
+            self._probing = True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f'{self.name} circuit closed')
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_aborted(self):
+        # *the call ended without an answer from the host
+        self._probing = False
+
+    def record_failure(self, error: str):
+        self.failures += 1
+        self.last_failure = error
+        self._probing = False
+        if (self.state == self.HALF_OPEN
+                or self.failures >= self.failure_threshold):
+            if self.state != self.OPEN:
+                logger.warning(f'{self.name} circuit opened: {error}')
+            self.state = self.OPEN
+            self.opened_at = datetime.now()
+            self._opened_monotonic = monotonic()
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opened_at': self.opened_at,
+            'last_failure': self.last_failure
+        }
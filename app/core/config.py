@@ -12,6 +12,54 @@ class Settings(BaseSettings):
     TSO_API_PWD: str
     LMPT2_API_KEY: str
     LOG_LEVEL: str = 'INFO'
+    # *upstream http client (seconds)
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 30.0
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_TOTAL_TIMEOUT: float = 45.0
+    # *per-host circuit breaker: consecutive failures before opening, and
+    # *seconds before an open circuit lets a probe through
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RESET_TIMEOUT: float = 30.0
+    # *EGAT token lifetime when GetToken omits expires_in (seconds)
+    EGAT_TOKEN_TTL: int = 1800
+    EGAT_TOKEN_REFRESH_MARGIN: int = 60
+    # *max concurrent sysgen/actual calls per batch
+    EGAT_FETCH_CONCURRENCY: int = 6
+    # *sysgen/actual day payloads kept in memory, and the delay after each
+    # *minute before today's entry is refetched (seconds)
+    REQMW_CACHE_SIZE: int = 256
+    REQMW_TODAY_LAG: float = 5.0
+    # *parsed GetGenMWData days kept in memory, today's entry is refetched
+    # *the same way as REQMW_TODAY_LAG
+    GENMW_CACHE_SIZE: int = 64
+    GENMW_TODAY_LAG: float = 5.0
+    # *seconds the combined TSO supply/demand values are shared between tiles
+    TSO_LATEST_TTL: float = 15.0
+    # *LMPT2 tank level days kept in memory, today's entry expires after
+    # *LMPT2_TODAY_TTL seconds
+    LMPT2_CACHE_SIZE: int = 32
+    LMPT2_TODAY_TTL: float = 300.0
+    # *rows per COPY / upsert batch for CSV ingestion
+    INGEST_BATCH_SIZE: int = 5000
+    # *bytes read from an upload at a time, row errors kept per upload
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_MAX_ERRORS: int = 100
+    # *worker processes for CPU-bound upload parsing (Excel)
+    PARSE_WORKERS: int = 1
+    # *background ingestion of /submit uploads: jobs running at once,
+    # *finished jobs kept for GET /jobs/{id}, where uploads are spooled
+    JOB_CONCURRENCY: int = 2
+    JOB_HISTORY: int = 100
+    JOB_SPOOL_DIR: str = '/tmp/eccc-uploads'
+    # *deepest zoom of the project cluster pyramid, deeper requests reuse it
+    CLUSTER_MAX_ZOOM: int = 14
+    # *background poller for the current dashboard tiles (seconds)
+    POLLER_ENABLED: bool = True
+    POLL_INTERVAL_ELECTRIC: int = 60
+    POLL_INTERVAL_GAS: int = 60
+    POLL_INTERVAL_LNG: int = 300
+    POLL_LAG: float = 5.0
 
     class Config:
         env_file = ".env"
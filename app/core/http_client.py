@@ -0,0 +1,103 @@
+import json
+import asyncio
+import logging
+import httpx
+from urllib.parse import urlsplit
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.core.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# *headers that carry credentials only, they do not change the response
+_UNKEYED_HEADERS = {'token', 'authorization'}
+
+_client: httpx.AsyncClient | None = None
+flight = SingleFlight()
+breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    # *one pooled client per process, created lazily on the running loop
+    global _client
+    if _client is None or _client.is_closed:
+        timeout = httpx.Timeout(settings.HTTP_READ_TIMEOUT,
+                                connect=settings.HTTP_CONNECT_TIMEOUT)
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS)
+        _client = httpx.AsyncClient(timeout=timeout, limits=limits)
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def get(url: str,
+              params: dict = None,
+              headers: dict = None,
+              **kwargs) -> httpx.Response:
+    key = __request_key('GET', url, params, headers)
+    return await flight.do(
+        key,
+        lambda: __send('GET', url, params=params, headers=headers, **kwargs),
+        label=urlsplit(url).netloc)
+
+
+async def post(url: str,
+               json: dict = None,
+               headers: dict = None,
+               **kwargs) -> httpx.Response:
+    key = __request_key('POST', url, json, headers)
+    return await flight.do(
+        key,
+        lambda: __send('POST', url, json=json, headers=headers, **kwargs),
+        label=urlsplit(url).netloc)
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    if host not in breakers:
+        breakers[host] = CircuitBreaker(
+            host,
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.BREAKER_RESET_TIMEOUT)
+    return breakers[host]
+
+
+async def __send(method: str, url: str, **kwargs) -> httpx.Response:
+    logger.debug(f'{method} {url}')
+    # *fail fast while the host is known to be down
+    breaker = get_breaker(urlsplit(url).netloc)
+    breaker.before_call()
+    try:
+        response = await asyncio.wait_for(
+            get_client().request(method, url, **kwargs),
+            timeout=settings.HTTP_TOTAL_TIMEOUT)
+    except (httpx.TransportError, asyncio.TimeoutError) as e:
+        breaker.record_failure(f'{type(e).__name__}: {e}')
+        raise
+    except BaseException:
+        # *cancelled or a local error, says nothing about the host
+        breaker.record_aborted()
+        raise
+
+    if response.status_code >= 500:
+        breaker.record_failure(f'status {response.status_code}')
+    else:
+        breaker.record_success()
+    return response
+
+
+def __request_key(method: str, url: str, payload: dict,
+                  headers: dict) -> tuple:
+    headers = {
+        k: v
+        for k, v in (headers or {}).items()
+        if k.lower() not in _UNKEYED_HEADERS
+    }
+    return (method, url, json.dumps(payload, sort_keys=True, default=str),
+            tuple(sorted(headers.items())))
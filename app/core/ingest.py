@@ -0,0 +1,132 @@
+import csv
+import codecs
+import logging
+from io import StringIO
+from typing import AsyncGenerator
+from fastapi import HTTPException, UploadFile
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CsvStream:
+    # *reads a CSV upload chunk by chunk and hands out rows in batches, only
+    # *one chunk of text is held at a time. Rows are dicts like
+    # *csv.DictReader gives, blank lines are skipped
+
+    def __init__(self, file: UploadFile, batch_size: int):
+        self.file = file
+        self.batch_size = batch_size
+        self.fieldnames: list[str] = []
+        self.rows = 0
+        self.bytes = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._pending = ''
+        self._records: list[list[str]] = []
+        self._eof = False
+
+    async def read_header(self, required_columns: set[str]):
+        try:
+            while not self._records and not self._eof:
+                self._records = await self._read_records()
+        except (UnicodeDecodeError, csv.Error):
+            raise HTTPException(status_code=400, detail='invalidate file')
+
+        if self._records:
+            self.fieldnames = [name.strip() for name in self._records.pop(0)]
+        logger.debug(self.fieldnames)
+        missing = required_columns - set(self.fieldnames)
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Missing required columns: {', '.join(missing)}")
+
+    async def batches(self) -> AsyncGenerator[list[dict], None]:
+        batch = []
+        records, self._records = self._records, []
+        if not records:
+            records = await self._read_records()
+        while records:
+            for record in records:
+                batch.append(self._to_row(record))
+                if len(batch) >= self.batch_size:
+                    yield self._count(batch)
+                    batch = []
+            records = await self._read_records()
+        if batch:
+            yield self._count(batch)
+
+    async def _read_records(self) -> list[list[str]]:
+        # *next complete non-blank records, [] once the file is exhausted
+        while not self._eof:
+            chunk = await self.file.read(settings.UPLOAD_CHUNK_SIZE)
+            self.bytes += len(chunk)
+            if chunk:
+                text = self._pending + self._decoder.decode(chunk)
+                # *cut after the last line break outside quotes, a quoted
+                # *field may span lines and chunks
+                end = len(text)
+                while True:
+                    end = text.rfind('\n', 0, end)
+                    if end < 0 or text.count('"', 0, end) % 2 == 0:
+                        break
+                text, self._pending = text[:end + 1], text[end + 1:]
+            else:
+                self._eof = True
+                text = self._pending + self._decoder.decode(b'', final=True)
+                self._pending = ''
+
+            records = [
+                record for record in csv.reader(StringIO(text, newline=''))
+                if record
+            ]
+            if records:
+                return records
+        return []
+
+    def _to_row(self, record: list[str]) -> dict:
+        row = dict(zip(self.fieldnames, record))
+        if len(record) > len(self.fieldnames):
+            row[None] = record[len(self.fieldnames):]
+        for name in self.fieldnames[len(record):]:
+            row[name] = None
+        return row
+
+    def _count(self, batch: list[dict]) -> list[dict]:
+        self.rows += len(batch)
+        logger.info(f'{self.file.filename}: {self.rows} rows, '
+                    f'{self.bytes / 2**20:.1f} MiB read')
+        return batch
+
+
+async def open_csv(file: UploadFile,
+                   required_columns: set[str],
+                   batch_size: int = None) -> CsvStream:
+    # *400 on an undecodable file or a header without required_columns
+    stream = CsvStream(file, batch_size or settings.INGEST_BATCH_SIZE)
+    await stream.read_header(required_columns)
+    return stream
+
+
+class ErrorLog:
+    # *row errors of one upload, only the first max_size messages are kept
+    # *so a file full of bad rows does not grow without bound
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size or settings.UPLOAD_MAX_ERRORS
+        self.messages: list[str] = []
+        self.count = 0
+
+    def append(self, message: str):
+        self.count += 1
+        if len(self.messages) < self.max_size:
+            self.messages.append(message)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __str__(self) -> str:
+        text = '\n'.join(self.messages)
+        if self.count > len(self.messages):
+            text += f'\n... and {self.count - len(self.messages)} more'
+        return text
@@ -0,0 +1,154 @@
+import os
+import uuid
+import shutil
+import asyncio
+import logging
+import tempfile
+from datetime import datetime
+from fastapi import UploadFile
+from app.core.config import settings
+from app.core.ingest import ErrorLog
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    # *one spooled upload, run holds the progress counters it updates
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    ERROR = 'error'
+
+    def __init__(self, kind: str, path: str, filename: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.path = path
+        self.filename = filename
+        self.status = self.QUEUED
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.bytes_total = os.path.getsize(path)
+        self.bytes_read = 0
+        self.rows = 0
+        self.written = 0
+        self.errors = ErrorLog()
+        self.message = None
+
+    def open_upload(self) -> UploadFile:
+        # *the spooled file, readable like the original upload
+        return UploadFile(open(self.path, 'rb'),
+                          size=self.bytes_total,
+                          filename=self.filename)
+
+    def stats(self) -> dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'filename': self.filename,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': round(self.bytes_read * 100 / self.bytes_total, 1)
+            if self.bytes_total else 100.0,
+            'rows': self.rows,
+            'written': self.written,
+            'error_count': len(self.errors),
+            'errors': self.errors.messages,
+            'message': self.message
+        }
+
+
+# *job id -> Job, finished jobs beyond JOB_HISTORY are dropped oldest first
+_jobs: dict[str, Job] = {}
+_tasks: set[asyncio.Task] = set()
+_semaphore: asyncio.Semaphore | None = None
+
+
+async def spool(file: UploadFile) -> str:
+    # *copy the upload to JOB_SPOOL_DIR, the request's own temp file is gone
+    # *once the response is sent
+    await file.seek(0)
+    os.makedirs(settings.JOB_SPOOL_DIR, exist_ok=True)
+    # *keep the extension, openpyxl checks it
+    handle, path = tempfile.mkstemp(prefix='upload-',
+                                    suffix=os.path.splitext(file.filename
+                                                            or '')[1],
+                                    dir=settings.JOB_SPOOL_DIR)
+    try:
+        with os.fdopen(handle, 'wb') as out:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, out,
+                                    settings.UPLOAD_CHUNK_SIZE)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+async def submit(kind: str, file: UploadFile, run) -> Job:
+    # *spool file and queue `await run(job)`, at most JOB_CONCURRENCY jobs
+    # *run at once. run raises to fail the job, row errors go to job.errors
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.JOB_CONCURRENCY)
+
+    job = Job(kind, await spool(file), file.filename)
+    _jobs[job.id] = job
+    __prune()
+    task = asyncio.create_task(__run(job, run))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    logger.info(f'job {job.id} queued: {kind} {job.filename}, '
+                f'{job.bytes_total} bytes')
+    return job
+
+
+def get(job_id: str) -> Job | None:
+    return _jobs.get(job_id)
+
+
+def stats() -> dict:
+    counts = {}
+    for job in _jobs.values():
+        counts[job.status] = counts.get(job.status, 0) + 1
+    return counts
+
+
+async def stop():
+    # *queued and running jobs are cancelled, their spool files removed
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+
+
+async def __run(job: Job, run):
+    try:
+        async with _semaphore:
+            job.status = Job.RUNNING
+            job.started_at = datetime.now()
+            logger.info(f'job {job.id} started')
+            await run(job)
+            job.status = Job.DONE
+    except asyncio.CancelledError:
+        job.status = Job.ERROR
+        job.message = 'cancelled'
+        raise
+    except Exception as e:
+        logger.exception(e)
+        job.status = Job.ERROR
+        job.message = str(e)
+    finally:
+        job.finished_at = datetime.now()
+        os.remove(job.path)
+        logger.info(f'job {job.id} {job.status}: {job.rows} rows, '
+                    f'{job.written} written, {len(job.errors)} errors')
+
+
+def __prune():
+    finished = [
+        job_id for job_id, job in _jobs.items()
+        if job.status in (Job.DONE, Job.ERROR)
+    ]
+    for job_id in finished[:max(len(finished) - settings.JOB_HISTORY, 0)]:
+        del _jobs[job_id]
@@ -0,0 +1,59 @@
+import numpy as np
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+# *bucket sizes in minutes
+RESOLUTIONS = (1, 5, 15, 30, 60)
+AGGREGATIONS = ('last', 'mean', 'max', 'min')
+
+_REDUCERS = {
+    'max': np.maximum.reduceat,
+    'min': np.minimum.reduceat,
+}
+
+
+def resample(series: list, resolution: int, how: str = 'last') -> list[list]:
+    # *[[seconds, value], ...] -> one [bucket_end_seconds, value] per bucket
+    # *a bucket covers (end - resolution, end], like the half-hour F columns
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f'resolution should be one of {RESOLUTIONS}')
+    if how not in AGGREGATIONS:
+        raise ValueError(f'aggregation should be one of {AGGREGATIONS}')
+    if not series:
+        return []
+
+    step = resolution * 60
+    array = np.asarray(series, dtype=float).reshape(-1, 2)
+    order = np.argsort(array[:, 0], kind='stable')
+    keys = np.ceil(array[order, 0] / step).astype(np.int64)
+    values = array[order, 1]
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+    if how == 'last':
+        result = values[ends - 1]
+    elif how == 'mean':
+        result = np.add.reduceat(values, starts) / (ends - starts)
+    else:
+        result = _REDUCERS[how](values, starts)
+    return [[int(key) * step, value]
+            for key, value in zip(keys[starts].tolist(), result.tolist())]
+
+
+def resample_timeseries(values: list[tuple[datetime, float]],
+                        resolution: int,
+                        how: str = 'last') -> list[tuple[datetime, float]]:
+    # *same as resample for (datetime, value) pairs, seconds are counted from
+    # *midnight of the first point
+    if not values:
+        return values
+    origin = datetime.combine(values[0][0].date(), time(0, 0))
+    series = [[(dt - origin).total_seconds(), value] for dt, value in values]
+    return [(origin + timedelta(seconds=seconds), value)
+            for seconds, value in resample(series, resolution, how)]
+
+
+def value_at(series: list, seconds: float):
+    # *latest [seconds, value] at or before seconds, else the first one
+    position = bisect_right(series, seconds, key=lambda item: item[0])
+    return series[max(position - 1, 0)]
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    # *concurrent callers with the same key share one in-flight call
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._calls = defaultdict(int)
+        self._coalesced = defaultdict(int)
+
+    async def do(self,
+                 key: Hashable,
+                 func: Callable[[], Awaitable],
+                 label: str = 'default'):
+        self._calls[label] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced[label] += 1
+            logger.debug(f'coalesced {label} call')
+        else:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # *shield so one cancelled caller does not cancel the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {
+            'calls': sum(self._calls.values()),
+            'coalesced': sum(self._coalesced.values()),
+            'inflight': len(self._inflight),
+            'by_label': {
+                label: {
+                    'calls': calls,
+                    'coalesced': self._coalesced[label]
+                }
+                for label, calls in self._calls.items()
+            }
+        }
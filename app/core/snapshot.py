@@ -0,0 +1,76 @@
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# *name -> (response, updated_at, max_age), replaced as a whole on every put
+# *so readers never see a half-updated snapshot
+_snapshots: dict = {}
+
+
+def put(name: str, response, max_age: float):
+    global _snapshots
+    _snapshots = {**_snapshots, name: (response, datetime.now(), max_age)}
+
+
+def get(name: str):
+    # *returns the response while it is younger than its max_age
+    entry = _snapshots.get(name)
+    if entry is None:
+        return None
+
+    response, updated_at, max_age = entry
+    if (datetime.now() - updated_at).total_seconds() > max_age:
+        logger.debug(f'snapshot {name} is older than {max_age} s')
+        return None
+    return response
+
+
+def get_stale(name: str):
+    # *last good response regardless of age, marked stale
+    entry = _snapshots.get(name)
+    if entry is None:
+        return None
+    return entry[0].model_copy(update={'status': 'stale'})
+
+
+async def get_or_build(name: str, build):
+    # *fresh snapshot, else a live build, else the last good value as stale.
+    # *A good live build is kept too, with the poller's max_age if it warms
+    # *name, else with 0 so it only ever serves as the stale fallback
+    response = get(name)
+    if response is not None:
+        return response
+
+    try:
+        response = await build()
+    except Exception as e:
+        stale = get_stale(name)
+        if stale is None:
+            raise
+        logger.warning(f'{name} build failed, serving stale snapshot: {e}')
+        return stale
+
+    if response.status == 'ok':
+        entry = _snapshots.get(name)
+        put(name, response, max_age=entry[2] if entry else 0)
+        return response
+
+    stale = get_stale(name)
+    if stale is not None:
+        logger.warning(f'{name} build returned {response.status}, '
+                       'serving stale snapshot')
+        return stale
+    return response
+
+
+def stats() -> dict:
+    now = datetime.now()
+    return {
+        name: {
+            'updated_at': updated_at,
+            'age': round((now - updated_at).total_seconds(), 3),
+            'max_age': max_age
+        }
+        for name, (_, updated_at, max_age) in _snapshots.items()
+    }
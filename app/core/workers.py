@@ -0,0 +1,34 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    # *one pool per process, created on first use. Workers are spawned, not
+    # *forked, so they do not inherit the event loop or open connections
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PARSE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'))
+        logger.info(f'process pool started: {settings.PARSE_WORKERS} workers')
+    return _pool
+
+
+async def run(func, *args):
+    # *CPU-bound func(*args) in a worker process, func and args must pickle
+    return await asyncio.get_running_loop().run_in_executor(
+        get_pool(), func, *args)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -1,20 +1,48 @@
-import requests
+import asyncio
 import logging
 from datetime import date, datetime, timedelta, time
+from time import monotonic
 from app.core.config import settings
-from requests.auth import HTTPBasicAuth
+from app.core import http_client
+from app.core.cache import LRUCache
+from app.core.singleflight import SingleFlight
+from app.crud import electric, genmw
+from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
+TOKEN_URL = 'https://www.sothailand.com/PSCODWebAPI/api/LoginApi/GetToken'
 
-def get_total_lasted_customerDirect():
-    header = __gen_header()
+# *generation day payloads per source
+GEN_MW_URLS = {
+    1: 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetGenMWData',
+    2: 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetGenMWDataPlantAndTieLine'
+}
+
+# *a day is final once this long has passed since its midnight end
+DAY_CLOSE_GRACE = timedelta(minutes=30)
+
+# *(index, date) -> sysgen/actual day payload
+reqmw_cache = LRUCache(maxsize=settings.REQMW_CACHE_SIZE)
+
+# *(source, date) -> parsed GetGenMWData day
+gen_day_cache = LRUCache(maxsize=settings.GENMW_CACHE_SIZE)
+_gen_day_flight = SingleFlight()
+
+# *process-wide token cache, refreshed by one task at a time
+_token = {'value': None, 'expires_at': 0.0}
+_token_lock = asyncio.Lock()
+_token_refresh_task: asyncio.Task | None = None
+
+
+async def get_total_lasted_customerDirect():
+    header = await __gen_header()
     url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetDirectCustomerVal'
     header['st'] = date.today().strftime("%d-%m-%Y")
     header['en'] = date.today().strftime("%d-%m-%Y")
 
     try:
-        response = requests.get(url=url, headers=header)
+        response = await __egat_get(url, header)
         data = response.json()['data']['directcus']
 
         if not data:
@@ -35,14 +63,30 @@ def get_total_lasted_customerDirect():
         return {'timestamp': None, 'value': 0}
 
 
-def get_total_customerDirect(start_date: date, end_date: date):
-    header = __gen_header()
+async def get_total_customerDirect(start_date: date,
+                                   end_date: date,
+                                   db: AsyncSession = None):
+    # *a single closed day is served from / saved to electricDayProfile
+    is_stored = (db is not None and start_date == end_date
+                 and is_closed_day(start_date))
+    if is_stored:
+        stored = await electric.get_day_profiles(db, 'customer_direct', [0],
+                                                 start_date)
+        if 0 in stored:
+            for timestamp, value in stored[0]:
+                yield {
+                    'timestamp': datetime.fromisoformat(timestamp),
+                    'value': value
+                }
+            return
+
+    header = await __gen_header()
     url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetDirectCustomerVal'
-    header['st'] = start_date.today().strftime("%d-%m-%Y")
-    header['en'] = end_date.today().strftime("%d-%m-%Y")
+    header['st'] = start_date.strftime("%d-%m-%Y")
+    header['en'] = end_date.strftime("%d-%m-%Y")
 
     try:
-        response = requests.get(url=url, headers=header)
+        response = await __egat_get(url, header)
         data = response.json()['data']['directcus']
 
         result = {}
@@ -58,6 +102,14 @@ def get_total_customerDirect(start_date: date, end_date: date):
                 }
             else:
                 result[timestamp_str]['value'] += float(row['VALUE'])
+
+        if is_stored and result:
+            values = [[row['timestamp'].isoformat(), row['value']]
+                      for row in result.values()]
+            await __save_profile(
+                db,
+                electric.save_day_profiles(db, 'customer_direct', start_date,
+                                           {0: values}))
         for index in result.keys():
             data = result[index]
             yield data
@@ -66,7 +118,7 @@ def get_total_customerDirect(start_date: date, end_date: date):
         logger.exception(e)
 
 
-def get_reqMw(index: int, target_date: date):
+async def get_reqMw(index: int, target_date: date):
     # *Get index params
     """
     index = 0 : system gen ค่าประมาณ (20000 - 25000)
@@ -87,44 +139,97 @@ def get_reqMw(index: int, target_date: date):
     index = 15 VSPP_RCC3: vspp ใต้
     index = 16 VSPP_RCC4: vspp เหนือ
     """
+    if isinstance(target_date, datetime):
+        target_date = target_date.date()
+    key = (index, target_date)
+    data = reqmw_cache.get(key)
+    if data is not None:
+        return data
+
     params = {'index': index, 'day': target_date.strftime("%d-%m-%Y")}
     url = "https://www.sothailand.com/genws/ws/sysgen/actual"
-    response = requests.get(url=url, params=params)
+    response = await http_client.get(url, params=params)
 
     try:
-        return response.json()
+        data = response.json()
     except Exception as e:
         logging.error(f'{response}, error message: {e}')
+        return None
 
-
-def get_reqMw_selected_min(index: int, traget_date: date, min: int):
-    data = get_reqMw(index, traget_date)
-    max_position = len(data['list']) - 1
-    if max_position < min:
-        position = max_position
-    else:
-        position = min
-    return data['list'][position]
-
-
-def get_reqMw_profile(index: int, traget_date: date, strat_min, end_min: int,
-                      interval_min):
-    logger.debug(
-        f'start: {strat_min}, end: {end_min}, interval:{interval_min}')
-    data = get_reqMw(index, traget_date)
-    max_position = len(data['list']) - 1
-    if max_position < end_min:
-        end_position = max_position
+    if not isinstance(data, dict) or 'list' not in data:
+        return data
+    if is_closed_day(target_date):
+        # *past days never change, keep them until evicted
+        reqmw_cache.set(key, data)
     else:
-        end_position = end_min
-    position = strat_min
-    while end_position < position:
-        yield data['list'][position]
-        position += interval_min
+        # *the open day updates every minute upstream
+        now = datetime.now()
+        ttl = 60 - now.second - now.microsecond / 1e6
+        reqmw_cache.set(key, data, ttl=ttl + settings.REQMW_TODAY_LAG)
+    return data
+
+
+def is_closed_day(target_date: date) -> bool:
+    day_end = datetime.combine(target_date + timedelta(days=1), time(0, 0))
+    return datetime.now() >= day_end + DAY_CLOSE_GRACE
+
+
+async def get_reqMw_batch(indices: list[int],
+                          target_date: date,
+                          limit: int = None,
+                          db: AsyncSession = None) -> tuple[dict, dict]:
+    # *fetch several indices of the same day concurrently
+    # *returns (data, errors), both keyed by index
+    # *with db, closed days are served from / saved to electricDayProfile
+    if isinstance(target_date, datetime):
+        target_date = target_date.date()
+    is_stored = db is not None and is_closed_day(target_date)
+
+    data = {}
+    if is_stored:
+        stored = await electric.get_day_profiles(db, 'sysgen', indices,
+                                                 target_date)
+        day = target_date.strftime("%d-%m-%Y")
+        data = {
+            index: {
+                'day': day,
+                'list': values
+            }
+            for index, values in stored.items()
+        }
+    missing = [index for index in indices if index not in data]
+    semaphore = asyncio.Semaphore(limit or settings.EGAT_FETCH_CONCURRENCY)
+
+    async def fetch(index: int):
+        async with semaphore:
+            return await get_reqMw(index, target_date)
+
+    results = await asyncio.gather(*(fetch(index) for index in missing),
+                                   return_exceptions=True)
+    errors = {}
+    fetched = {}
+    for index, result in zip(missing, results):
+        if isinstance(result, Exception):
+            errors[index] = f'{type(result).__name__}: {result}'
+        elif not result or 'list' not in result:
+            errors[index] = f'unexpected response: {result}'
+        else:
+            fetched[index] = result
 
+    if is_stored and fetched:
+        profiles = {index: result['list'] for index, result in fetched.items()}
+        await __save_profile(
+            db,
+            electric.save_day_profiles(db, 'sysgen', target_date, profiles))
+    data.update(fetched)
 
-def get_current_genMw_source3():
-    header = __gen_header()
+    for index, error in errors.items():
+        logger.error(f'reqMw index {index} ({target_date}) failed: {error}')
+    return data, errors
+
+
+async def get_current_genMw_source3():
+    header = await __gen_header()
     url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetMwPlantByTime'
     try:
         request_time = datetime.now()
@@ -139,7 +244,7 @@ def get_current_genMw_source3():
         while i < 5:
             header['dt'] = request_time.strftime("%d/%m/%Y %H:%M")
             logger.debug(f'header: {header}')
-            response = requests.get(url=url, headers=header)
+            response = await __egat_get(url, header)
             data = response.json()
             data = data['data']['MwPlantByTime']
             request_time -= timedelta(minutes=30)
@@ -151,9 +256,8 @@ def get_current_genMw_source3():
         logger.exception(e)
 
 
-def get_current_genMw_source2():
-    header = __gen_header()
-    url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetGenMWDataPlantAndTieLine'
+async def get_current_genMw(source: int):
+    # *per-type values of the latest complete half hour, source 1 or 2
     try:
         request_time = datetime.now()
         logger.debug(f'now {request_time}')
@@ -163,26 +267,19 @@ def get_current_genMw_source2():
         else:
             request_time = request_time.replace(
                 minute=0, second=0) - timedelta(minutes=30)
-        i = 0
         if request_time.minute == 0 and request_time.hour == 0:
             process_time = request_time - timedelta(days=1)
         else:
             process_time = request_time
-        header['dd'] = process_time.strftime("%d/%m/%Y")
         hour_str = f'F{process_time.hour}'
         if process_time.minute == 30:
             hour_str += 'H'
-        logger.debug(f'header: {header}')
-        response = requests.get(url=url, headers=header)
-        data = response.json()
-        for item in data['data']:
-            if item['TYPE'] == None:
-                continue
 
+        day = await get_gen_day(source, process_time.date())
+        for plant_type, value in day.current(hour_str).items():
             result = {
-                'plant_type':
-                'imp' if 'IMP' in item['MEANAME'] else item['TYPE'],
-                'value': item[hour_str],
+                'plant_type': plant_type,
+                'value': value,
                 'data_timestamp': request_time
             }
             logger.debug(result)
@@ -192,352 +289,201 @@ def get_current_genMw_source2():
         logger.exception(e)
 
 
-def get_current_genMw_source1():
-    header = __gen_header()
-    url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetGenMWData'
-    try:
-        request_time = datetime.now()
-        logger.debug(f'now {request_time}')
-        if request_time.minute > 30:
-            request_time = request_time.replace(
-                minute=30, second=0) - timedelta(minutes=30)
-        else:
-            request_time = request_time.replace(
-                minute=0, second=0) - timedelta(minutes=30)
-        i = 0
-        if request_time.minute == 0 and request_time.hour == 0:
-            process_time = request_time - timedelta(days=1)
-        else:
-            process_time = request_time
-        header['dd'] = process_time.strftime("%d/%m/%Y")
-        hour_str = f'F{process_time.hour}'
-        if process_time.minute == 30:
-            hour_str += 'H'
-        logger.debug(f'header: {header}')
-        response = requests.get(url=url, headers=header)
-        data = response.json()
-        for item in data['data']:
-            if item['PLANTTYPE'] == None or 'ZZ_SCOD' in item['MEANAME']:
-                logger.debug(f'{item['MEANAME']} was skipped')
-                continue
-
-            result = {
-                'plant_type':
-                'imp' if 'IMP' in item['MEANAME'] else item['PLANTTYPE'],
-                'value':
-                item[hour_str],
-                'data_timestamp':
-                request_time
-            }
-            logger.debug(result)
-            yield result
-
-    except Exception as e:
-        logger.exception(e)
+async def get_gen_day(source: int, request_date: date) -> genmw.GenDay:
+    # *one GetGenMWData call and parse per (source, day), shared by the
+    # *current view and both profile groupings
+    key = (source, request_date)
+    day = gen_day_cache.get(key)
+    if day is not None:
+        return day
+    return await _gen_day_flight.do(
+        key, lambda: __load_gen_day(source, request_date), label='gen_day')
 
 
-def get_profile_genMw_group_by_type_source2(request_date: date):
-    header = __gen_header()
-    url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetGenMWDataPlantAndTieLine'
-    try:
-        dt = datetime.combine(request_date, time(0, 0))
-        hour_list = [
-            "F0H", "F1", "F1H", "F2", "F2H", "F3", "F3H", "F4", "F4H", "F5",
-            "F5H", "F6", "F6H", "F7", "F7H", "F8", "F8H", "F9", "F9H", "F10",
-            "F10H", "F11", "F11H", "F12", "F12H", "F13", "F13H", "F14", "F14H",
-            "F15", "F15H", "F16", "F16H", "F17", "F17H", "F18", "F18H", "F19",
-            "F19H", "F20", "F20H", "F21", "F21H", "F22", "F22H", "F23", "F23H",
-            "F0"
-        ]
-        end_min = 30 * (len(hour_list) + 1)
-        dt_list = [dt + timedelta(minutes=i) for i in range(30, end_min, 30)]
+async def get_profile_genMw_group_by_type_source2(request_date: date):
+    async for group in __gen_profile(request_date, 2, 'type'):
+        yield group
 
-        header['dd'] = request_date.strftime("%d/%m/%Y")
-        logger.debug(f'header: {header}')
-        response = requests.get(url=url, headers=header)
-        data = response.json()
 
-        result = {
-            'total': {
-                'tag': 'total',
-                'values': [(dt, 0) for dt in dt_list]
-            }
-        }
+async def get_profile_genMw_group_by_type_source1(request_date: date):
+    async for group in __gen_profile(request_date, 1, 'type'):
+        yield group
 
-        for item in data['data']:
-            plant_type = item['TYPE']
-            if not plant_type:
-                continue
-
-            if 'IMP' in item['MEANAME']:
-                plant_type = 'imp'
-            elif 'EGAT' in plant_type:
-                plant_type = 'egat'
-            elif 'IPP' in plant_type:
-                plant_type = 'ipp'
-            elif 'SPP' in plant_type:
-                plant_type = 'spp'
-            else:
-                continue
-
-            if plant_type not in result.keys():
-                result[plant_type] = {'tag': plant_type, 'values': []}
-                for i in range(len(hour_list)):
-                    hour = hour_list[i]
-                    dt = dt_list[i]
-                    result[plant_type]['values'].append((dt, item[hour]))
-                    old_dt, old_value = result['total']['values'][i]
-                    result['total']['values'][i] = (old_dt,
-                                                    old_value + item[hour])
-            else:
-                for i in range(len(hour_list)):
-                    hour = hour_list[i]
-                    old_dt, old_value = result[plant_type]['values'][i]
-                    result[plant_type]['values'][i] = (old_dt,
-                                                       old_value + item[hour])
 
-                    old_dt, old_value = result['total']['values'][i]
-                    result['total']['values'][i] = (old_dt,
-                                                    old_value + item[hour])
+async def get_profile_genMw_group_by_fuel_source1(request_date: date):
+    async for group in __gen_profile(request_date, 1, 'fuel'):
+        yield group
 
-        for r in result.keys():
-            yield result[r]
 
-    except Exception as e:
-        logger.exception(e)
+async def get_profile_genMw_group_by_fuel_source2(request_date: date):
+    async for group in __gen_profile(request_date, 2, 'fuel'):
+        yield group
 
 
-def get_profile_genMw_group_by_type_source1(request_date: date):
-    header = __gen_header()
-    url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetGenMWData'
-    try:
-        dt = datetime.combine(request_date, time(0, 0))
-        hour_list = [
-            "F0H", "F1", "F1H", "F2", "F2H", "F3", "F3H", "F4", "F4H", "F5",
-            "F5H", "F6", "F6H", "F7", "F7H", "F8", "F8H", "F9", "F9H", "F10",
-            "F10H", "F11", "F11H", "F12", "F12H", "F13", "F13H", "F14", "F14H",
-            "F15", "F15H", "F16", "F16H", "F17", "F17H", "F18", "F18H", "F19",
-            "F19H", "F20", "F20H", "F21", "F21H", "F22", "F22H", "F23", "F23H",
-            "F0"
+async def get_profile_genMw(request_date: date,
+                            source: int,
+                            group_by: str,
+                            db: AsyncSession = None):
+    # *group_by 'type' or 'fuel', closed days are served from / saved to
+    # *electricGenProfile when db is given
+    is_stored = db is not None and is_closed_day(request_date)
+    if is_stored:
+        groups = [
+            group async for group in electric.get_gen_profile(
+                db, source, group_by, request_date)
         ]
-        end_min = 30 * (len(hour_list) + 1)
-        dt_list = [dt + timedelta(minutes=i) for i in range(30, end_min, 30)]
-
-        header['dd'] = request_date.strftime("%d/%m/%Y")
-        logger.debug(f'header: {header}')
-        response = requests.get(url=url, headers=header)
-        data = response.json()
-
-        result = {
-            'total': {
-                'tag': 'total',
-                'values': [(dt, 0) for dt in dt_list]
-            }
-        }
+        if groups:
+            for group in groups:
+                yield group
+            return
+
+    if group_by == 'type' and source == 1:
+        profile = get_profile_genMw_group_by_type_source1(request_date)
+    elif group_by == 'type' and source == 2:
+        profile = get_profile_genMw_group_by_type_source2(request_date)
+    elif group_by == 'fuel' and source == 1:
+        profile = get_profile_genMw_group_by_fuel_source1(request_date)
+    elif group_by == 'fuel' and source == 2:
+        profile = get_profile_genMw_group_by_fuel_source2(request_date)
+    else:
+        raise ValueError(f'no {group_by} profile for source {source}')
+    groups = [group async for group in profile]
 
-        for item in data['data']:
-            plant_type = item['PLANTTYPE']
-            if not plant_type:
-                logger.info(f'{item['MEANAME']} was skipped')
-                continue
-
-            if 'IMP' in item['MEANAME']:
-                plant_type = 'imp'
-            elif 'ZZ_SCOD' in item['MEANAME']:
-                logger.info(f'{item['MEANAME']} was skipped')
-                continue
-            elif 'EGAT' in plant_type:
-                plant_type = 'egat'
-            elif 'IPP' in plant_type:
-                plant_type = 'ipp'
-            elif 'SPP' in plant_type:
-                plant_type = 'spp'
-            else:
-                logger.info(f'{item['MEANAME']} was skipped')
-                continue
-
-            if plant_type not in result.keys():
-                result[plant_type] = {'tag': plant_type, 'values': []}
-                for i in range(len(hour_list)):
-                    hour = hour_list[i]
-                    dt = dt_list[i]
-                    result[plant_type]['values'].append((dt, item[hour]))
-                    old_dt, old_value = result['total']['values'][i]
-                    result['total']['values'][i] = (old_dt,
-                                                    old_value + item[hour])
-            else:
-                for i in range(len(hour_list)):
-                    hour = hour_list[i]
-                    old_dt, old_value = result[plant_type]['values'][i]
-                    result[plant_type]['values'][i] = (old_dt,
-                                                       old_value + item[hour])
+    if is_stored and groups:
+        await __save_profile(
+            db,
+            electric.save_gen_profile(db, source, group_by, request_date,
+                                      groups))
+    for group in groups:
+        yield group
 
-                    old_dt, old_value = result['total']['values'][i]
-                    result['total']['values'][i] = (old_dt,
-                                                    old_value + item[hour])
 
-        for r in result.keys():
-            yield result[r]
+async def get_gen_mw_by_time(datetime: datetime):
+    header = await __gen_header()
+    url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetDirectCustomerVal'
+    header['dt'] = datetime.strftime("%d-%m-%Y %H:%M")
+    try:
+        response = await __egat_get(url, header)
+        data = response.json()['data']['MwPlantByTime']
+        return data
 
     except Exception as e:
         logger.exception(e)
 
 
-def get_profile_genMw_group_by_fuel_source1(request_date: date):
-    header = __gen_header()
-    url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetGenMWData'
+async def __gen_profile(request_date: date, source: int, group_by: str):
     try:
-        dt = datetime.combine(request_date, time(0, 0))
-        hour_list = [
-            "F0H", "F1", "F1H", "F2", "F2H", "F3", "F3H", "F4", "F4H", "F5",
-            "F5H", "F6", "F6H", "F7", "F7H", "F8", "F8H", "F9", "F9H", "F10",
-            "F10H", "F11", "F11H", "F12", "F12H", "F13", "F13H", "F14", "F14H",
-            "F15", "F15H", "F16", "F16H", "F17", "F17H", "F18", "F18H", "F19",
-            "F19H", "F20", "F20H", "F21", "F21H", "F22", "F22H", "F23", "F23H",
-            "F0"
-        ]
-        end_min = 30 * (len(hour_list) + 1)
-        dt_list = [dt + timedelta(minutes=i) for i in range(30, end_min, 30)]
-
-        header['dd'] = request_date.strftime("%d/%m/%Y")
-        logger.debug(f'header: {header}')
-        response = requests.get(url=url, headers=header)
-        data = response.json()
+        day = await get_gen_day(source, request_date)
+        for group in day.profile(group_by):
+            yield group
 
-        result = {}
+    except Exception as e:
+        logger.exception(e)
 
-        for item in data['data']:
-            fuel = item['FUEL']
-            if not fuel:
-                continue
-
-            if 'GAS' in fuel:
-                fuel = 'ก๊าซธรรมชาติ'
-            elif 'RENEWABLE' in fuel:
-                fuel = 'พลังงานทดแทน'
-            elif 'HYDRO' in fuel:
-                fuel = 'พลังงานน้ำ'
-            elif 'COAL' in fuel:
-                fuel = 'ถ่านหิน'
-            elif 'OIL' in fuel:
-                fuel = 'น้ำมัน'
-            else:
-                logger.debug(f'{fuel} was skipped')
-                continue
 
-            if fuel not in result.keys():
-                result[fuel] = {'tag': fuel, 'values': []}
-                for i in range(len(hour_list)):
-                    hour = hour_list[i]
-                    dt = dt_list[i]
-                    result[fuel]['values'].append((dt, item[hour]))
+async def __load_gen_day(source: int, request_date: date) -> genmw.GenDay:
+    header = await __gen_header()
+    header['dd'] = request_date.strftime("%d/%m/%Y")
+    logger.debug(f'header: {header}')
+    response = await __egat_get(GEN_MW_URLS[source], header)
+    day = genmw.GenDay(response.json()['data'], request_date, source)
 
-            else:
-                for i in range(len(hour_list)):
-                    hour = hour_list[i]
-                    old_dt, old_value = result[fuel]['values'][i]
-                    result[fuel]['values'][i] = (old_dt,
-                                                 old_value + item[hour])
+    if is_closed_day(request_date):
+        gen_day_cache.set((source, request_date), day)
+    else:
+        # *the open day is refetched once a minute at most
+        now = datetime.now()
+        ttl = 60 - now.second - now.microsecond / 1e6
+        gen_day_cache.set((source, request_date),
+                          day,
+                          ttl=ttl + settings.GENMW_TODAY_LAG)
+    return day
 
-        for r in result.keys():
-            yield result[r]
 
+async def __save_profile(db: AsyncSession, save):
+    # *a failed write must not fail the request that fetched the data
+    try:
+        await save
     except Exception as e:
         logger.exception(e)
+        await db.rollback()
 
 
-def get_profile_genMw_group_by_fuel_source2(request_date: date):
-    header = __gen_header()
-    url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetGenMWDataPlantAndTieLine'
-    try:
-        dt = datetime.combine(request_date, time(0, 0))
-        hour_list = [
-            "F0H", "F1", "F1H", "F2", "F2H", "F3", "F3H", "F4", "F4H", "F5",
-            "F5H", "F6", "F6H", "F7", "F7H", "F8", "F8H", "F9", "F9H", "F10",
-            "F10H", "F11", "F11H", "F12", "F12H", "F13", "F13H", "F14", "F14H",
-            "F15", "F15H", "F16", "F16H", "F17", "F17H", "F18", "F18H", "F19",
-            "F19H", "F20", "F20H", "F21", "F21H", "F22", "F22H", "F23", "F23H",
-            "F0"
-        ]
-        end_min = 30 * (len(hour_list) + 1)
-        dt_list = [dt + timedelta(minutes=i) for i in range(30, end_min, 30)]
+async def __gen_header() -> dict:
+    header = {
+        'Accept': '*/*',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'token': await __get_token()
+    }
+    return header
 
-        header['dd'] = request_date.strftime("%d/%m/%Y")
-        logger.debug(f'header: {header}')
-        response = requests.get(url=url, headers=header)
-        data = response.json()
 
-        result = {}
+async def __egat_get(url: str, header: dict):
+    response = await http_client.get(url, headers=header)
+    if response.status_code == 401:
+        # *token revoked or expired early, refresh once and retry
+        logger.warning(f'token rejected by {url}, refreshing')
+        header['token'] = await __get_token(stale=header['token'])
+        response = await http_client.get(url, headers=header)
+    return response
 
-        for item in data['data']:
-            fuel = item['FUEL']
-            if not fuel:
-                continue
-
-            if 'GAS' in fuel:
-                fuel = 'ก๊าซธรรมชาติ'
-            elif 'RENEWABLE' in fuel:
-                fuel = 'พลังงานทดแทน'
-            elif 'HYDRO' in fuel:
-                fuel = 'พลังงานน้ำ'
-            elif 'COAL' in fuel:
-                fuel = 'ถ่านหิน'
-            elif 'OIL' in fuel:
-                fuel = 'น้ำมัน'
-            else:
-                logger.debug(f'{fuel} was skipped')
-                continue
 
-            if fuel not in result.keys():
-                result[fuel] = {'tag': fuel, 'values': []}
-                for i in range(len(hour_list)):
-                    hour = hour_list[i]
-                    dt = dt_list[i]
-                    result[fuel]['values'].append((dt, item[hour]))
+def __is_token_valid(stale: str = None) -> bool:
+    return (_token['value'] is not None and _token['value'] != stale
+            and monotonic() < _token['expires_at'])
 
-            else:
-                for i in range(len(hour_list)):
-                    hour = hour_list[i]
-                    old_dt, old_value = result[fuel]['values'][i]
-                    result[fuel]['values'][i] = (old_dt,
-                                                 old_value + item[hour])
 
-        for r in result.keys():
-            yield result[r]
+async def __get_token(stale: str = None) -> str:
+    if __is_token_valid(stale):
+        return _token['value']
 
-    except Exception as e:
-        logger.exception(e)
+    async with _token_lock:
+        # *another caller may have refreshed while we waited
+        if __is_token_valid(stale):
+            return _token['value']
+        return await __fetch_token()
 
 
-def get_gen_mw_by_time(datetime: datetime):
-    header = __gen_header()
-    url = 'https://www.sothailand.com/PSCODWebAPI/api/StatDataApi/GetDirectCustomerVal'
-    header['dt'] = datetime.strftime("%d-%m-%Y %H:%M")
+async def __fetch_token() -> str:
+    global _token_refresh_task
+    response = await http_client.get(TOKEN_URL,
+                                     auth=(settings.EGAT_API_USER,
+                                           settings.EGAT_API_PWD))
+    response = response.json()
+    logger.debug(f'token response {response}')
     try:
-        response = requests.get(url=url, headers=header)
-        data = response.json()['data']['MwPlantByTime']
-        return data
-
+        token = response['access_token']
+        lifetime = float(
+            response.get('expires_in') or settings.EGAT_TOKEN_TTL)
     except Exception as e:
         logger.exception(e)
+        raise
 
+    _token['value'] = token
+    _token['expires_at'] = monotonic() + lifetime
 
-def __gen_header() -> dict:
+    # *refresh in the background before the token expires
+    delay = lifetime - min(settings.EGAT_TOKEN_REFRESH_MARGIN, lifetime / 2)
+    if (_token_refresh_task and not _token_refresh_task.done()
+            and _token_refresh_task is not asyncio.current_task()):
+        _token_refresh_task.cancel()
+    _token_refresh_task = asyncio.create_task(__refresh_token_later(delay))
+    return token
 
-    url = 'https://www.sothailand.com/PSCODWebAPI/api/LoginApi/GetToken'
-    response = requests.get(url=url,
-                            auth=HTTPBasicAuth(settings.EGAT_API_USER,
-                                               settings.EGAT_API_PWD))
-    header = {
-        'Accept': '*/*',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'token': ''
-    }
-    response = response.json()
-    logger.debug(f'token response {response}')
+
+async def __refresh_token_later(delay: float):
+    await asyncio.sleep(delay)
     try:
-        header['token'] = response['access_token']
-        return header
+        async with _token_lock:
+            await __fetch_token()
+        logger.debug('token refreshed in background')
     except Exception as e:
-        logger.exception(e)
+        # *fall back to refreshing on the next request
+        logger.error(f'background token refresh failed: {e}')
+        _token['expires_at'] = 0.0
+
+
+def stop_token_refresh():
+    if _token_refresh_task and not _token_refresh_task.done():
+        _token_refresh_task.cancel()
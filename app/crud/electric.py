@@ -1,13 +1,36 @@
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, select, update, or_, and_
-from app.models.electric import DummyData, Project, PeakDay
+from sqlalchemy import func, select, delete, or_, and_, text
+from sqlalchemy.dialects.postgresql import insert, aggregate_order_by
+from app.models.electric import DummyData, DummyDataLatest, Project, PeakDay, DayProfile, GenProfile
+from app.db.session import get_driver_connection
+from app.db.upsert import upsert_rows
+from app.crud.project_sheet import project_row
+from app.crud.project_clusters import ProjectClusters
+from app.core.config import settings
 from app.schemas.electric import DummyDataCreate, ProjectCreate, PeakDayCreate
 from typing import AsyncGenerator
 from datetime import datetime, date, timedelta
 
 logger = logging.getLogger(__name__)
 
+# *peak_type -> (day, windows) of get_summary_peak, kept current by upsert_peaks
+# *a read only fills the cache if no peak was written while it ran
+_peak_cache: dict = {}
+_peak_writes = 0
+
+# *cached get_project_fuel_stats and cluster pyramid, dropped whenever
+# *projects change
+PROJECT_METRICS = ('count', 'installed_mw', 'contracted_mw')
+_fuel_stats: dict | None = None
+_clusters: ProjectClusters | None = None
+_project_writes = 0
+
+DUMMY_DATA_COLUMNS = [
+    'submit_timestamp', 'data_timestamp', 'category', 'zone', 'province',
+    'value_tag', 'value'
+]
+
 
 async def create_dummy_data(db: AsyncSession,
                             data: DummyDataCreate) -> DummyData:
@@ -18,38 +41,135 @@ async def create_dummy_data(db: AsyncSession,
     return new_data
 
 
+async def ensure_dummy_data_partitions(db: AsyncSession, months):
+    # *create the monthly electricDummyData partitions that do not exist yet
+    # *in one short transaction of their own, call it before rows of those
+    # *months are written.
+    # *Rows of the month already in the default partition are moved into the
+    # *new one, and it is attached rather than created as PARTITION OF, which
+    # *would lock the whole table against concurrent uploads
+    months = sorted({month.replace(day=1) for month in months})
+    if not months:
+        return
+    # *one partition change at a time, two uploads may need the same month
+    await db.execute(
+        select(func.pg_advisory_xact_lock(func.hashtext('electricDummyData'))))
+    names = {month: dummy_data_partition_name(month) for month in months}
+    result = await db.execute(
+        text('SELECT relname FROM pg_class WHERE relname = ANY(:names)'),
+        {'names': list(names.values())})
+    existing = set(result.scalars().all())
+
+    for month, name in names.items():
+        if name in existing:
+            continue
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        await db.execute(
+            text(f'CREATE TABLE "{name}" (LIKE "electricDummyData")'))
+        result = await db.execute(
+            text('WITH moved AS ('
+                 'DELETE FROM "electricDummyData_default" '
+                 f"WHERE data_timestamp >= '{month}' "
+                 f"AND data_timestamp < '{next_month}' RETURNING *) "
+                 f'INSERT INTO "{name}" SELECT * FROM moved'))
+        await db.execute(
+            text(f'ALTER TABLE "electricDummyData" ATTACH PARTITION "{name}" '
+                 f"FOR VALUES FROM ('{month}') TO ('{next_month}')"))
+        logger.info(f'partition {name} created, {result.rowcount} rows '
+                    'moved from the default partition')
+    await db.commit()
+
+
+def dummy_data_partition_name(month: date) -> str:
+    return f'electricDummyData_{month:%Y_%m}'
+
+
+async def refresh_dummy_data_latest(db: AsyncSession, category: str,
+                                    submit_timestamp: datetime):
+    # *make one submission of electricDummyData the current version of every
+    # *data_timestamp it covers, keys it no longer contains are dropped.
+    # *Refreshes of a category run one at a time, and a data_timestamp that
+    # *already holds a newer submission is left alone, so uploads finishing
+    # *out of order never mix two submissions
+    await db.execute(
+        select(func.pg_advisory_xact_lock(func.hashtext(category))))
+
+    keys = [
+        DummyData.category, DummyData.data_timestamp, DummyData.zone,
+        DummyData.province, DummyData.value_tag, DummyData.submit_timestamp
+    ]
+    not_superseded = ~select(DummyDataLatest.data_timestamp).where(
+        DummyDataLatest.category == category,
+        DummyDataLatest.data_timestamp == DummyData.data_timestamp,
+        DummyDataLatest.submit_timestamp > submit_timestamp).exists()
+    submission = [
+        DummyData.category == category,
+        DummyData.submit_timestamp == submit_timestamp, not_superseded
+    ]
+    # *GROUP BY keeps NULL and '' apart, as the readers of
+    # *electricDummyData always did
+    submitted = select(*keys[:5], func.sum(DummyData.value),
+                       keys[5]).where(*submission).group_by(*keys)
+
+    covered = select(DummyData.data_timestamp).where(*submission).distinct()
+    await db.execute(
+        delete(DummyDataLatest).where(
+            DummyDataLatest.category == category,
+            DummyDataLatest.data_timestamp.in_(covered)))
+
+    await db.execute(
+        insert(DummyDataLatest).from_select([
+            'category', 'data_timestamp', 'zone', 'province', 'value_tag',
+            'value', 'submit_timestamp'
+        ], submitted))
+    await db.commit()
+
+
+async def copy_dummy_data(db: AsyncSession, records: list[tuple]):
+    # *COPY one batch of rows ordered like DUMMY_DATA_COLUMNS into the
+    # *staging table of the session transaction, see merge_dummy_data
+    connection = await get_driver_connection(db)
+    await __create_dummy_data_staging(db)
+    await connection.copy_records_to_table('dummy_data_staging',
+                                           records=records,
+                                           columns=DUMMY_DATA_COLUMNS)
+
+
+async def merge_dummy_data(db: AsyncSession):
+    # *staged rows into electricDummyData, their monthly partitions must
+    # *exist by now (see ensure_dummy_data_partitions). The caller commits
+    await __create_dummy_data_staging(db)
+    columns = ', '.join(DUMMY_DATA_COLUMNS)
+    await db.execute(
+        text(f'INSERT INTO "electricDummyData" ({columns}) '
+             f'SELECT {columns} FROM dummy_data_staging'))
+
+
+async def __create_dummy_data_staging(db: AsyncSession):
+    await db.execute(
+        text('CREATE TEMP TABLE IF NOT EXISTS dummy_data_staging ('
+             'submit_timestamp timestamp, data_timestamp timestamp, '
+             'category varchar(16), zone varchar, province varchar, '
+             'value_tag varchar, value double precision'
+             ') ON COMMIT DROP'))
+
+
 async def get_latest_dummy_data(
         db: AsyncSession, category: str,
         data_timestamp: datetime) -> AsyncGenerator[dict, None]:
     # *Normalize to start of the month
     data_timestamp = data_timestamp.replace(day=1, second=0, microsecond=0)
 
-    # *Base filters
-    base_filters = [
-        DummyData.category == category,
-        DummyData.data_timestamp == data_timestamp,
-    ]
+    stmt = (select(
+        DummyDataLatest.data_timestamp,
+        func.max(DummyDataLatest.submit_timestamp).label('submit_timestamp'),
+        func.sum(DummyDataLatest.value).label('value')).where(
+            DummyDataLatest.category == category,
+            DummyDataLatest.data_timestamp == data_timestamp).group_by(
+                DummyDataLatest.data_timestamp))
 
-    # *Get latest submit_timestamp for the given data_timestamp
-    latest_submit_stmt = select(func.max(
-        DummyData.submit_timestamp)).where(*base_filters)
-    result = await db.execute(latest_submit_stmt)
-    latest_submit_time = result.scalar()
-
-    if not latest_submit_time:
-        return  # No data available
-
-    # *Final query: include latest submit_timestamp in filters
-    final_stmt = (select(
-        DummyData.data_timestamp, DummyData.submit_timestamp,
-        func.sum(DummyData.value).label('value')).where(
-            *base_filters,
-            DummyData.submit_timestamp == latest_submit_time).group_by(
-                DummyData.data_timestamp, DummyData.submit_timestamp))
-
-    # *Stream results and yield
-    stream_result = await db.stream(final_stmt)
-    async for row in stream_result:
+    result = await db.execute(stmt)
+    for row in result:
         yield {
             "data_timestamp": row.data_timestamp,
             "submit_timestamp": row.submit_timestamp,
@@ -63,33 +183,16 @@ async def get_latest_dummy_data_grouped_by_zone(
     # *Normalize to start of the month
     data_timestamp = data_timestamp.replace(day=1, second=0, microsecond=0)
 
-    # *Base filters
-    base_filters = [
-        DummyData.category == category,
-        DummyData.data_timestamp == data_timestamp,
-    ]
+    stmt = (select(
+        DummyDataLatest.data_timestamp, DummyDataLatest.zone,
+        func.max(DummyDataLatest.submit_timestamp).label('submit_timestamp'),
+        func.sum(DummyDataLatest.value).label('value')).where(
+            DummyDataLatest.category == category,
+            DummyDataLatest.data_timestamp == data_timestamp).group_by(
+                DummyDataLatest.data_timestamp, DummyDataLatest.zone))
 
-    # *Get latest submit_timestamp for the given data_timestamp
-    latest_submit_stmt = select(func.max(
-        DummyData.submit_timestamp)).where(*base_filters)
-    result = await db.execute(latest_submit_stmt)
-    latest_submit_time = result.scalar()
-
-    if not latest_submit_time:
-        return  # No data available
-
-    # *Final query: include latest submit_timestamp in filters
-    final_stmt = (select(
-        DummyData.data_timestamp, DummyData.submit_timestamp, DummyData.zone,
-        func.sum(DummyData.value).label('value')).where(
-            *base_filters,
-            DummyData.submit_timestamp == latest_submit_time).group_by(
-                DummyData.data_timestamp, DummyData.submit_timestamp,
-                DummyData.zone))
-
-    # *Stream results and yield
-    stream_result = await db.stream(final_stmt)
-    async for row in stream_result:
+    result = await db.execute(stmt)
+    for row in result:
         yield {
             "data_timestamp": row.data_timestamp,
             "submit_timestamp": row.submit_timestamp,
@@ -102,126 +205,158 @@ async def get_profile_dummy_data(
         db: AsyncSession, category: str, datetime_from: datetime,
         datetime_to: datetime,
         min_interval: int) -> AsyncGenerator[dict, None]:
-    current_timestamp = datetime_from.replace(second=0, microsecond=0)
+    slots = __slots(datetime_from, datetime_to, min_interval)
+    stmt = (select(DummyDataLatest.data_timestamp,
+                   func.sum(DummyDataLatest.value).label('value')).where(
+                       DummyDataLatest.category == category,
+                       DummyDataLatest.data_timestamp.in_(slots)).group_by(
+                           DummyDataLatest.data_timestamp).order_by(
+                               DummyDataLatest.data_timestamp))
 
-    while current_timestamp <= datetime_to:
-        base_filters = [
-            DummyData.category == category,
-            DummyData.data_timestamp == current_timestamp,
-        ]
-
-        # Get the latest submit timestamp for the current data_timestamp
-        latest_submit_stmt = select(func.max(
-            DummyData.submit_timestamp)).where(*base_filters)
-        result = await db.execute(latest_submit_stmt)
-        latest_submit_time = result.scalar()
-
-        if latest_submit_time:
-            # Query the sum of value for this timestamp and latest submission
-            final_stmt = (select(
-                DummyData.data_timestamp, DummyData.submit_timestamp,
-                func.sum(DummyData.value).label('value')).where(
-                    *base_filters,
-                    DummyData.submit_timestamp == latest_submit_time).group_by(
-                        DummyData.data_timestamp, DummyData.submit_timestamp))
-
-            result = await db.execute(final_stmt)
-            row = result.first()
-            if row:
-                yield (row.data_timestamp, row.value)
-
-        current_timestamp += timedelta(minutes=min_interval)
+    result = await db.execute(stmt)
+    for row in result:
+        yield (row.data_timestamp, row.value)
 
 
 async def get_profile_dummy_data_grouped_by_value_tag(
         db: AsyncSession, category: str, datetime_from: datetime,
         datetime_to: datetime,
         min_interval: int) -> AsyncGenerator[dict, None]:
-    current_timestamp = datetime_from.replace(second=0, microsecond=0)
+    slots = __slots(datetime_from, datetime_to, min_interval)
+    stmt = (select(DummyDataLatest.data_timestamp, DummyDataLatest.value_tag,
+                   func.sum(DummyDataLatest.value).label('value')).where(
+                       DummyDataLatest.category == category,
+                       DummyDataLatest.data_timestamp.in_(slots)).group_by(
+                           DummyDataLatest.data_timestamp,
+                           DummyDataLatest.value_tag).order_by(
+                               DummyDataLatest.data_timestamp,
+                               DummyDataLatest.value_tag))
+
+    result = await db.execute(stmt)
+    for row in result:
+        yield row.value_tag, (row.data_timestamp, row.value)
 
-    while current_timestamp <= datetime_to:
-        base_filters = [
-            DummyData.category == category,
-            DummyData.data_timestamp == current_timestamp,
-        ]
-
-        # Get the latest submit timestamp for the current data_timestamp
-        latest_submit_stmt = select(func.max(
-            DummyData.submit_timestamp)).where(*base_filters)
-        result = await db.execute(latest_submit_stmt)
-        latest_submit_time = result.scalar()
-
-        if latest_submit_time:
-            # Query the sum of value for this timestamp and latest submission
-            final_stmt = (select(
-                DummyData.data_timestamp, DummyData.submit_timestamp,
-                DummyData.value_tag,
-                func.sum(DummyData.value).label('value')).where(
-                    *base_filters,
-                    DummyData.submit_timestamp == latest_submit_time).group_by(
-                        DummyData.data_timestamp, DummyData.submit_timestamp,
-                        DummyData.value_tag))
-
-            result = await db.execute(final_stmt)
-            row = result.first()
-            if row:
-                yield row.value_tag, (row.data_timestamp, row.value)
 
+def __slots(datetime_from: datetime, datetime_to: datetime,
+            min_interval: int) -> list[datetime]:
+    # *data_timestamps on the min_interval grid from datetime_from
+    slots = []
+    current_timestamp = datetime_from.replace(second=0, microsecond=0)
+    while current_timestamp <= datetime_to:
+        slots.append(current_timestamp)
         current_timestamp += timedelta(minutes=min_interval)
+    return slots
 
 
 async def get_summary_peak(db: AsyncSession, peak_type: str):
+    # *window -> {'value', 'timestamp'} or None, served from the peak cache
+    # *and read with one query when the cache is empty or from another day
     today = date.today()
-    first_day_of_month = today.replace(day=1)
-    first_day_of_year = today.replace(month=1, day=1)
-
-    async def fetch_peak(start_date):
-        stmt = (select(PeakDay).where(
-            PeakDay.peak_type == peak_type, PeakDay.peak_date
-            >= start_date).order_by(PeakDay.value.desc()).limit(1))
-        result = await db.execute(stmt)
-        row = result.scalar_one_or_none()
-        if row:
-            return {"value": row.value, "timestamp": row.peak_datetime}
-        return None
-
+    entry = _peak_cache.get(peak_type)
+    if entry is None or entry[0] != today:
+        starts = __peak_window_starts(today)
+        columns = []
+        for window, start in starts.items():
+            in_window = PeakDay.peak_date >= start
+            columns.append(
+                func.max(PeakDay.value).filter(in_window).label(window))
+            columns.append(
+                func.array_agg(
+                    aggregate_order_by(PeakDay.peak_datetime,
+                                       PeakDay.value.desc())).filter(
+                                           in_window)[1].label(
+                                               f'{window}_timestamp'))
+        stmt = select(*columns).where(PeakDay.peak_type == peak_type)
+        writes = _peak_writes
+        row = (await db.execute(stmt)).one()
+
+        windows = {}
+        for window in starts:
+            value = getattr(row, window)
+            windows[window] = None if value is None else {
+                "value": value,
+                "timestamp": getattr(row, f'{window}_timestamp')
+            }
+        entry = (today, windows)
+        if writes == _peak_writes:
+            _peak_cache[peak_type] = entry
+    return dict(entry[1])
+
+
+def __peak_window_starts(today: date) -> dict:
     return {
-        "today": await fetch_peak(today),
-        "month": await fetch_peak(first_day_of_month),
-        "year": await fetch_peak(first_day_of_year),
-        "total": await fetch_peak(date(2000, 1, 1)),
+        "today": today,
+        "month": today.replace(day=1),
+        "year": today.replace(month=1, day=1),
+        "total": date(2000, 1, 1),
     }
 
 
+def __update_peak_cache(peaks: list[PeakDayCreate]):
+    # *raise the cached windows a written peak beats. Lowering the peak a
+    # *window holds drops the entry, the next read queries again
+    global _peak_writes
+    _peak_writes += 1
+    for peak in peaks:
+        entry = _peak_cache.get(peak.peak_type)
+        if entry is None:
+            continue
+        day, windows = entry
+        for window, start in __peak_window_starts(day).items():
+            current = windows[window]
+            if peak.peak_date < start:
+                continue
+            if current is None or peak.value >= current["value"]:
+                windows[window] = {
+                    "value": peak.value,
+                    "timestamp": peak.peak_datetime
+                }
+            elif current["timestamp"].date() == peak.peak_date:
+                del _peak_cache[peak.peak_type]
+                break
+
+
+async def get_project_fuel_stats(db: AsyncSession) -> dict:
+    # *(primary_fuel_a_group_1, primary_fuel_a_group_3) -> PROJECT_METRICS of
+    # *active projects, one GROUP BY kept until projects are written
+    global _fuel_stats
+    if _fuel_stats is not None:
+        return _fuel_stats
+
+    stmt = (select(Project.primary_fuel_a_group_1,
+                   Project.primary_fuel_a_group_3,
+                   func.count().label('count'),
+                   func.coalesce(func.sum(Project.installed_cap_mw),
+                                 0).label('installed_mw'),
+                   func.coalesce(func.sum(Project.contracted_cap_mw),
+                                 0).label('contracted_mw')).where(
+                                     or_(Project.contract_status.like('COD%'),
+                                         Project.contract_status.like('N%'))).
+            group_by(Project.primary_fuel_a_group_1,
+                     Project.primary_fuel_a_group_3))
+    writes = _project_writes
+    result = await db.execute(stmt)
+    stats = {}
+    for row in result:
+        key = (row.primary_fuel_a_group_1, row.primary_fuel_a_group_3)
+        stats[key] = {metric: getattr(row, metric) for metric in PROJECT_METRICS}
+    if writes == _project_writes:
+        _fuel_stats = stats
+    return stats
+
+
 async def count_active_projects_by_fuel(db: AsyncSession,
                                         fuel: str,
                                         fuel_type: str = None) -> int:
-
-    if fuel_type == 'renew':
-        stmt = (select(func.count()).select_from(Project).where(
-            or_(Project.contract_status.like('COD%'),
-                Project.contract_status.like('N%')),
-            and_(Project.primary_fuel_a_group_1 == 'Renewable',
-                 Project.primary_fuel_a_group_3 == fuel)))
-    elif fuel_type == 'fossil':
-        stmt = (select(func.count()).select_from(Project).where(
-            or_(Project.contract_status.like('COD%'),
-                Project.contract_status.like('N%')),
-            and_(Project.primary_fuel_a_group_1 == 'Fossil',
-                 Project.primary_fuel_a_group_3 == fuel)))
-    else:
-        stmt = (select(func.count()).select_from(Project).where(
-            or_(Project.contract_status.like('COD%'),
-                Project.contract_status.like('N%')),
-            Project.primary_fuel_a_group_3 == fuel))
-
-    result = await db.execute(stmt)
-    return result.scalar()
+    stats = await get_project_fuel_stats(db)
+    fuel_group = {'renew': 'Renewable', 'fossil': 'Fossil'}.get(fuel_type)
+    return sum(values['count'] for (group_1, group_3), values in stats.items()
+               if group_3 == fuel and fuel_group in (None, group_1))
 
 
 async def get_projects_location_by_fuel(db: AsyncSession):
-    stmt = (select(Project.primary_fuel_a_group_1, Project.lat,
-                   Project.lng).where(
+    stmt = (select(Project.primary_fuel_a_group_1, Project.lat, Project.lng,
+                   Project.installed_cap_mw).where(
                        and_(
                            or_(Project.contract_status.like('COD%'),
                                Project.contract_status.like('N%')),
@@ -232,43 +367,129 @@ async def get_projects_location_by_fuel(db: AsyncSession):
         yield {
             'fuel': row.primary_fuel_a_group_1,
             'lat': row.lat,
-            'lng': row.lng
+            'lng': row.lng,
+            'mw': row.installed_cap_mw
         }
 
 
+async def get_project_clusters(db: AsyncSession) -> ProjectClusters:
+    if _clusters is not None:
+        return _clusters
+    return await build_project_clusters(db)
+
+
+async def build_project_clusters(db: AsyncSession) -> ProjectClusters:
+    # *rebuild the cluster pyramid from the active project locations, called
+    # *after a project ingest and on the first request
+    global _clusters
+    writes = _project_writes
+    projects = [row async for row in get_projects_location_by_fuel(db)]
+    clusters = ProjectClusters(projects, settings.CLUSTER_MAX_ZOOM)
+    if writes == _project_writes:
+        _clusters = clusters
+    return clusters
+
+
+async def upsert_projects(db: AsyncSession, projects: list[ProjectCreate]):
+    await upsert_project_rows(db, [project_row(data) for data in projects])
+
+
+async def upsert_project_rows(db: AsyncSession, rows: list[dict]) -> int:
+    # *rows are project_row dicts, the ones whose content_hash matches the
+    # *stored project are skipped. Returns the number of rows written
+    result = await db.execute(
+        select(Project.g_project_key, Project.content_hash).where(
+            Project.g_project_key.in_([row['g_project_key'] for row in rows])))
+    stored = dict(result.all())
+    changed = [
+        row for row in rows
+        if stored.get(row['g_project_key']) != row['content_hash']
+    ]
+    await upsert_rows(db, Project, changed, index_elements=['g_project_key'])
+    await db.commit()
+    if changed:
+        __invalidate_project_stats()
+    return len(changed)
+
+
+def __invalidate_project_stats():
+    global _fuel_stats, _clusters, _project_writes
+    _fuel_stats = None
+    _clusters = None
+    _project_writes += 1
+
+
 async def upsert_project(db: AsyncSession, data: ProjectCreate):
-    stmt = select(Project).where(Project.g_project_key == data.g_project_key)
-    result = await db.execute(stmt)
-    existing = result.scalar_one_or_none()
+    await upsert_projects(db, [data])
 
-    if existing:
-        for field, value in data.model_dump().items():
-            setattr(existing, field, value)
-        await db.commit()
-    else:
-        new_data = Project(**data.model_dump())
-        db.add(new_data)
-        await db.commit()
-        await db.refresh(new_data)
+
+async def upsert_peaks(db: AsyncSession, peaks: list[PeakDayCreate]):
+    await upsert_rows(db,
+                      PeakDay, [peak.model_dump() for peak in peaks],
+                      index_elements=['peak_date', 'peak_type'])
+    await db.commit()
+    __update_peak_cache(peaks)
 
 
 async def upsert_peak(db: AsyncSession, peak: PeakDayCreate):
-    stmt = select(PeakDay).where(PeakDay.peak_date == peak.peak_date,
-                                 PeakDay.peak_type == peak.peak_type)
+    await upsert_peaks(db, [peak])
+
+
+async def get_day_profiles(db: AsyncSession, source: str, indices: list[int],
+                           profile_date: date) -> dict:
+    stmt = select(DayProfile.index, DayProfile.values).where(
+        DayProfile.source == source, DayProfile.index.in_(indices),
+        DayProfile.profile_date == profile_date)
     result = await db.execute(stmt)
-    existing = result.scalar_one_or_none()
+    return {row.index: row.values for row in result}
+
+
+async def save_day_profiles(db: AsyncSession, source: str, profile_date: date,
+                            profiles: dict):
+    if not profiles:
+        return
+    update_timestamp = datetime.now()
+    stmt = insert(DayProfile).values([{
+        'source': source,
+        'index': index,
+        'profile_date': profile_date,
+        'values': values,
+        'update_timestamp': update_timestamp
+    } for index, values in profiles.items()]).on_conflict_do_nothing()
+    await db.execute(stmt)
+    await db.commit()
 
-    if existing:
-        # Update the existing record
-        await db.execute(
-            update(PeakDay).where(PeakDay.id == existing.id).values(
-                peak_datetime=peak.peak_datetime, value=peak.value))
-    else:
-        # Insert new record
-        new_record = PeakDay(peak_date=peak.peak_date,
-                             peak_datetime=peak.peak_datetime,
-                             peak_type=peak.peak_type,
-                             value=peak.value)
-        db.add(new_record)
 
+async def get_gen_profile(db: AsyncSession, source: int, group_by: str,
+                          profile_date: date) -> AsyncGenerator[dict, None]:
+    stmt = (select(GenProfile.tag, GenProfile.data_timestamp,
+                   GenProfile.value).where(
+                       GenProfile.source == source,
+                       GenProfile.group_by == group_by,
+                       GenProfile.profile_date == profile_date).order_by(
+                           GenProfile.tag, GenProfile.data_timestamp))
+    result = await db.execute(stmt)
+
+    groups = {}
+    for row in result:
+        if row.tag not in groups:
+            groups[row.tag] = {'tag': row.tag, 'values': []}
+        groups[row.tag]['values'].append((row.data_timestamp, row.value))
+    for group in groups.values():
+        yield group
+
+
+async def save_gen_profile(db: AsyncSession, source: int, group_by: str,
+                           profile_date: date, groups: list[dict]):
+    rows = [{
+        'source': source,
+        'group_by': group_by,
+        'profile_date': profile_date,
+        'tag': group['tag'],
+        'data_timestamp': data_timestamp,
+        'value': value
+    } for group in groups for data_timestamp, value in group['values']]
+    if not rows:
+        return
+    await db.execute(insert(GenProfile).values(rows).on_conflict_do_nothing())
     await db.commit()
@@ -0,0 +1,117 @@
+import logging
+import numpy as np
+from datetime import date, datetime, time, timedelta
+
+logger = logging.getLogger(__name__)
+
+# *half-hour columns of the GetGenMWData payloads, 00:30 .. 24:00
+HOUR_LIST = [
+    "F0H", "F1", "F1H", "F2", "F2H", "F3", "F3H", "F4", "F4H", "F5", "F5H",
+    "F6", "F6H", "F7", "F7H", "F8", "F8H", "F9", "F9H", "F10", "F10H", "F11",
+    "F11H", "F12", "F12H", "F13", "F13H", "F14", "F14H", "F15", "F15H", "F16",
+    "F16H", "F17", "F17H", "F18", "F18H", "F19", "F19H", "F20", "F20H", "F21",
+    "F21H", "F22", "F22H", "F23", "F23H", "F0"
+]
+
+# *payload column holding the plant type, per source
+TYPE_FIELD = {1: 'PLANTTYPE', 2: 'TYPE'}
+
+PLANT_TYPES = ['egat', 'ipp', 'spp']
+
+# *FUEL substring -> tag, first match wins
+FUEL_TAGS = [
+    ('GAS', 'ก๊าซธรรมชาติ'),
+    ('RENEWABLE', 'พลังงานทดแทน'),
+    ('HYDRO', 'พลังงานน้ำ'),
+    ('COAL', 'ถ่านหิน'),
+    ('OIL', 'น้ำมัน'),
+]
+
+
+def half_hour_timestamps(request_date: date) -> list[datetime]:
+    dt = datetime.combine(request_date, time(0, 0))
+    return [
+        dt + timedelta(minutes=30 * (i + 1)) for i in range(len(HOUR_LIST))
+    ]
+
+
+def to_matrix(rows: list[dict]) -> np.ndarray:
+    # *plants x 48, missing readings count as 0
+    matrix = np.array([[row.get(hour) for hour in HOUR_LIST] for row in rows],
+                      dtype=float).reshape(-1, len(HOUR_LIST))
+    return np.nan_to_num(matrix, copy=False)
+
+
+def plant_type(row: dict, source: int) -> str | None:
+    value = row.get(TYPE_FIELD[source])
+    if not value:
+        return None
+    if 'IMP' in row['MEANAME']:
+        return 'imp'
+    if source == 1 and 'ZZ_SCOD' in row['MEANAME']:
+        return None
+    for tag in PLANT_TYPES:
+        if tag.upper() in value:
+            return tag
+    return None
+
+
+def plant_fuel(row: dict) -> str | None:
+    value = row.get('FUEL')
+    if not value:
+        return None
+    for keyword, tag in FUEL_TAGS:
+        if keyword in value:
+            return tag
+    return None
+
+
+def group_sum(matrix: np.ndarray, labels: list) -> dict[str, np.ndarray]:
+    # *one mask row per group, a single matmul sums every group at once
+    # *groups keep the order they first appear in, None rows are dropped
+    tags = list(dict.fromkeys(label for label in labels if label is not None))
+    if not tags:
+        return {}
+    masks = np.array(labels, dtype=object)[None, :] == np.array(
+        tags, dtype=object)[:, None]
+    sums = masks.astype(float) @ matrix
+    return dict(zip(tags, sums))
+
+
+class GenDay:
+    # *one parsed GetGenMWData payload, the raw rows are not kept
+    # *matrix is plants x 48, types/fuels hold the group tag of each plant
+
+    def __init__(self, rows: list[dict], request_date: date, source: int):
+        self.request_date = request_date
+        self.source = source
+        self.matrix = to_matrix(rows)
+        self.types = [plant_type(row, source) for row in rows]
+        self.fuels = [plant_fuel(row) for row in rows]
+        logger.debug(f'{len(rows)} plants parsed for {request_date}, '
+                     f'{self.types.count(None)} without type')
+
+    def profile(self, group_by: str) -> list[dict]:
+        # *group_by 'type' (with a leading total) or 'fuel'
+        if group_by == 'type':
+            groups = group_sum(self.matrix, self.types)
+            total = sum(groups.values(), np.zeros(len(HOUR_LIST)))
+            groups = {'total': total, **groups}
+        elif group_by == 'fuel':
+            groups = group_sum(self.matrix, self.fuels)
+        else:
+            raise ValueError(f'unknown group_by {group_by}')
+
+        timestamps = half_hour_timestamps(self.request_date)
+        return [{
+            'tag': tag,
+            'values': list(zip(timestamps, values.tolist()))
+        } for tag, values in groups.items()]
+
+    def current(self, hour: str) -> dict[str, float]:
+        # *type -> value of one half-hour column
+        column = self.matrix[:, [HOUR_LIST.index(hour)]]
+        return {
+            tag: float(values[0])
+            for tag, values in group_sum(column, self.types).items()
+        }
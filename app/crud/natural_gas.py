@@ -1,15 +1,20 @@
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, text
+from app.db.session import get_driver_connection
+from app.db.upsert import upsert_rows
 from app.models.natural_gas import TankTable, EodValue
 from app.schemas.natural_gas import TankTableCreate, EodValueCreate
-from math import ceil, floor
+import numpy as np
 from datetime import date, timedelta
 from collections import defaultdict
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
 
+# *tank -> (level_cm, m3) sorted by level, see load_tank_table
+_tank_table: dict | None = None
+
 
 async def get_eod_value(db: AsyncSession, date_from: date, date_to: date,
                         tag: str):
@@ -46,81 +51,109 @@ async def get_eod_value(db: AsyncSession, date_from: date, date_to: date,
         date_result += timedelta(days=1)
 
 
-async def upsert_tank_table(db: AsyncSession, item: TankTableCreate):
-    stmt = select(TankTable).where(TankTable.level_cm == item.level_cm, )
-    result = await db.execute(stmt)
-    existing = result.scalar_one_or_none()
-
-    if existing:
-        # Update the existing record
-        await db.execute(
-            update(TankTable).where(
-                TankTable.level_cm == existing.level_cm).values(
-                    lmpt2_tank1_m3=item.lmpt2_tank1_m3,
-                    lmpt2_tank2_m3=item.lmpt2_tank2_m3))
-    else:
-        # Insert new record
-        new_record = TankTable(level_cm=item.level_cm,
-                               lmpt2_tank1_m3=item.lmpt2_tank1_m3,
-                               lmpt2_tank2_m3=item.lmpt2_tank2_m3)
-        db.add(new_record)
-
+async def upsert_tank_tables(db: AsyncSession, items: list[TankTableCreate]):
+    await upsert_rows(db,
+                      TankTable, [item.model_dump() for item in items],
+                      index_elements=['level_cm'])
     await db.commit()
 
 
-async def upsert_eod_value(db: AsyncSession, item: EodValueCreate):
-    stmt = select(EodValue).where(EodValue.date == item.date,
-                                  EodValue.tag == item.tag)
-    result = await db.execute(stmt)
-    existing = result.scalar_one_or_none()
+async def upsert_tank_table(db: AsyncSession, item: TankTableCreate):
+    await upsert_tank_tables(db, [item])
 
-    if existing:
-        # Update the existing record
-        await db.execute(
-            update(EodValue).where(EodValue.id == existing.id).values(
-                value=item.value, update_timestamp=item.update_timestamp))
-    else:
-        # Insert new record
-        new_record = EodValue(tag=item.tag,
-                              value=item.value,
-                              update_timestamp=item.update_timestamp,
-                              date=item.date)
-        db.add(new_record)
 
+async def upsert_eod_values(db: AsyncSession, items: list[EodValueCreate]):
+    await upsert_rows(db,
+                      EodValue, [item.model_dump() for item in items],
+                      index_elements=['date', 'tag'])
     await db.commit()
 
 
-async def cal_inventory(db: AsyncSession, level: float, tank: int) -> float:
-    level_cm = level / 10
-    level_cm_ceil = ceil(level_cm)
-    level_cm_floor = floor(level_cm)
-
-    # Case: exact match
-    if level_cm_ceil == level_cm_floor:
-        stmt = select(TankTable).where(TankTable.level_cm == level_cm)
-        result = await db.execute(stmt)
-        record = result.scalar_one_or_none()
-        if not record:
-            return 0  # or raise exception
-
-        return record.lmpt2_tank1_m3 if tank == 1 else record.lmpt2_tank2_m3
-
-    # Case: need interpolation
-    stmt_ceil = select(TankTable).where(TankTable.level_cm == level_cm_ceil)
-    stmt_floor = select(TankTable).where(TankTable.level_cm == level_cm_floor)
+async def upsert_eod_value(db: AsyncSession, item: EodValueCreate):
+    await upsert_eod_values(db, [item])
+
+
+async def copy_eod_values(db: AsyncSession, records: list[tuple]):
+    # *records are (line, date, tag, value, update_timestamp), COPY one batch
+    # *into the staging table of the session transaction, see
+    # *merge_eod_values
+    connection = await get_driver_connection(db)
+    await __create_eod_value_staging(db)
+    await connection.copy_records_to_table(
+        'eod_value_staging',
+        records=records,
+        columns=['line', 'date', 'tag', 'value', 'update_timestamp'])
+
+
+async def merge_eod_values(db: AsyncSession):
+    # *staged rows into naturalGasEodValue, the last line of a key wins
+    await __create_eod_value_staging(db)
+    await db.execute(
+        text('''
+        INSERT INTO "naturalGasEodValue" (date, tag, value, update_timestamp)
+        SELECT DISTINCT ON (date, tag) date, tag, value, update_timestamp
+        FROM eod_value_staging
+        ORDER BY date, tag, line DESC
+        ON CONFLICT (date, tag) DO UPDATE
+        SET value = excluded.value,
+            update_timestamp = excluded.update_timestamp
+        '''))
+    await db.commit()
 
-    result_ceil = await db.execute(stmt_ceil)
-    record_ceil = result_ceil.scalar_one_or_none()
 
-    result_floor = await db.execute(stmt_floor)
-    record_floor = result_floor.scalar_one_or_none()
+async def __create_eod_value_staging(db: AsyncSession):
+    await db.execute(
+        text('CREATE TEMP TABLE IF NOT EXISTS eod_value_staging ('
+             'line integer, date date, tag varchar(32), '
+             'value double precision, update_timestamp timestamp'
+             ') ON COMMIT DROP'))
 
-    if not record_ceil or not record_floor:
-        return 0  # or raise exception
 
-    invent_ceil = record_ceil.lmpt2_tank1_m3 if tank == 1 else record_ceil.lmpt2_tank2_m3
-    invent_floor = record_floor.lmpt2_tank1_m3 if tank == 1 else record_floor.lmpt2_tank2_m3
+async def load_tank_table(db: AsyncSession):
+    # *read naturalGasTanktable into sorted arrays, swapped in as a whole so
+    # *concurrent cal_inventory calls never see a half-loaded table
+    global _tank_table
+    stmt = select(TankTable).order_by(TankTable.level_cm)
+    result = await db.execute(stmt)
+    records = result.scalars().all()
 
-    invent_diff = (level_cm - level_cm_floor) / (
-        level_cm_ceil - level_cm_floor) * (invent_ceil - invent_floor)
-    return invent_floor + invent_diff
+    levels_cm = np.array([record.level_cm for record in records], dtype=float)
+    table = {}
+    for tank, column in ((1, 'lmpt2_tank1_m3'), (2, 'lmpt2_tank2_m3')):
+        volumes = np.array([getattr(record, column) for record in records],
+                           dtype=float)
+        known = ~np.isnan(volumes)
+        table[tank] = (levels_cm[known], volumes[known])
+    _tank_table = table
+    logger.info(f'tank table loaded: {len(records)} levels')
+
+
+async def ensure_tank_table(db: AsyncSession):
+    if _tank_table is None:
+        await load_tank_table(db)
+
+
+def cal_inventory(level, tank: int):
+    # *level in mm (scalar or array) -> m3. A whole cm level reads its row,
+    # *otherwise the floor and ceil cm rows are interpolated. 0 when a row
+    # *it needs is not in the strapping table
+    if _tank_table is None:
+        raise RuntimeError('tank table is not loaded')
+    levels_cm, volumes = _tank_table[tank]
+    level_cm = np.asarray(level, dtype=float) / 10
+    if not len(levels_cm):
+        inventory = np.zeros_like(level_cm)
+    else:
+        floor_cm = np.floor(level_cm)
+        floor_at, has_floor = __find_rows(levels_cm, floor_cm)
+        ceil_at, has_ceil = __find_rows(levels_cm, np.ceil(level_cm))
+        inventory = np.where(
+            has_floor & has_ceil, volumes[floor_at] +
+            (level_cm - floor_cm) * (volumes[ceil_at] - volumes[floor_at]), 0)
+    return float(inventory) if inventory.ndim == 0 else inventory
+
+
+def __find_rows(levels_cm: np.ndarray, level_cm: np.ndarray):
+    # *index of each level in the sorted table and whether it is really there
+    at = np.minimum(np.searchsorted(levels_cm, level_cm), len(levels_cm) - 1)
+    return at, levels_cm[at] == level_cm
@@ -0,0 +1,99 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# *grid cells per 256 px map tile edge, a cell is 360 / 2**zoom / 4 degrees
+CELLS_PER_TILE = 4
+
+
+def cell_size(zoom: int) -> float:
+    return 360 / 2**zoom / CELLS_PER_TILE
+
+
+class ClusterLevel:
+    # *the cells of one zoom level that hold projects, sorted by column then
+    # *row so a bounding box is a searchsorted slice plus a row mask
+
+    def __init__(self, zoom: int, lat: np.ndarray, lng: np.ndarray,
+                 fuel_index: np.ndarray, mw: np.ndarray, fuel_count: int):
+        self.zoom = zoom
+        size = cell_size(zoom)
+        columns = np.floor((lng + 180) / size).astype(np.int64)
+        rows = np.floor((lat + 90) / size).astype(np.int64)
+
+        cells, cell_of = np.unique(np.stack([columns, rows], axis=1),
+                                   axis=0,
+                                   return_inverse=True)
+        cell_of = cell_of.reshape(-1)
+        self.columns = cells[:, 0]
+        self.rows = cells[:, 1]
+        self.count = np.bincount(cell_of, minlength=len(cells))
+        self.mw = np.bincount(cell_of, weights=mw, minlength=len(cells))
+        self.lat = np.bincount(cell_of, weights=lat,
+                               minlength=len(cells)) / self.count
+        self.lng = np.bincount(cell_of, weights=lng,
+                               minlength=len(cells)) / self.count
+        # *cells x fuels
+        self.fuel_count = np.zeros((len(cells), fuel_count), dtype=np.int64)
+        self.fuel_mw = np.zeros((len(cells), fuel_count))
+        np.add.at(self.fuel_count, (cell_of, fuel_index), 1)
+        np.add.at(self.fuel_mw, (cell_of, fuel_index), mw)
+
+    def select(self, south: float, west: float, north: float,
+               east: float) -> np.ndarray:
+        # *indices of the cells overlapping the bounding box
+        size = cell_size(self.zoom)
+        start, stop = np.searchsorted(
+            self.columns, [(west + 180) // size, (east + 180) // size + 1])
+        rows = self.rows[start:stop]
+        in_box = (rows >= (south + 90) // size) & (rows <=
+                                                    (north + 90) // size)
+        return start + np.flatnonzero(in_box)
+
+
+class ProjectClusters:
+    # *grid cluster pyramid of project locations, zoom 0 .. max_zoom, built
+    # *once per project ingest. Requests deeper than max_zoom use max_zoom
+
+    def __init__(self, projects: list[dict], max_zoom: int):
+        self.max_zoom = max_zoom
+        projects = [
+            project for project in projects
+            if project['lat'] is not None and project['lng'] is not None
+        ]
+        self.fuels = sorted({project['fuel'] or 'N/A' for project in projects})
+        lat = np.array([project['lat'] for project in projects], dtype=float)
+        lng = np.array([project['lng'] for project in projects], dtype=float)
+        mw = np.nan_to_num(
+            np.array([project['mw'] for project in projects], dtype=float))
+        fuel_index = np.array([
+            self.fuels.index(project['fuel'] or 'N/A') for project in projects
+        ], dtype=np.int64)
+
+        self.levels = [
+            ClusterLevel(zoom, lat, lng, fuel_index, mw, len(self.fuels))
+            for zoom in range(max_zoom + 1)
+        ]
+        logger.info(f'project clusters built: {len(projects)} projects, '
+                    f'{len(self.levels[-1].count)} cells at zoom {max_zoom}')
+
+    def query(self, zoom: int, south: float, west: float, north: float,
+              east: float) -> list[dict]:
+        level = self.levels[min(max(zoom, 0), self.max_zoom)]
+        clusters = []
+        for i in level.select(south, west, north, east).tolist():
+            fuels = [{
+                'tag': fuel,
+                'count': int(level.fuel_count[i, j]),
+                'mw': float(level.fuel_mw[i, j])
+            } for j, fuel in enumerate(self.fuels) if level.fuel_count[i, j]]
+            clusters.append({
+                'tag': f'{level.zoom}/{level.columns[i]}/{level.rows[i]}',
+                'lat': float(level.lat[i]),
+                'lng': float(level.lng[i]),
+                'count': int(level.count[i]),
+                'mw': float(level.mw[i]),
+                'fuels': fuels
+            })
+        return clusters
@@ -0,0 +1,118 @@
+import json
+import hashlib
+import logging
+from datetime import datetime
+from openpyxl import load_workbook
+from app.core.ingest import ErrorLog
+from app.schemas.electric import ProjectCreate
+
+logger = logging.getLogger(__name__)
+
+# *columns left out of the content hash, they change on every upload
+UNHASHED_FIELDS = {'update_timestamp', 'content_hash'}
+
+
+def parse_project_sheet(path: str, update_timestamp: datetime,
+                        max_errors: int) -> tuple[list[dict], ErrorLog]:
+    # *runs in a worker process (see app.core.workers), the workbook is read
+    # *from path row by row in read-only mode and only the project rows are
+    # *sent back
+    try:
+        workbook = load_workbook(filename=path,
+                                 read_only=True,
+                                 data_only=True)
+    except Exception as e:
+        raise ValueError(f'Invalid Excel file: {e}')
+
+    rows = []
+    error_logs = ErrorLog(max_errors)
+    try:
+        sheet_rows = workbook.active.iter_rows(values_only=True)
+        headers = next(sheet_rows, ())
+        for row in sheet_rows:
+            # *read-only sheets may end with empty or short rows
+            if all(value is None for value in row):
+                continue
+            data = {
+                h: row[i] if i < len(row) else None
+                for i, h in enumerate(headers)
+            }
+            try:
+                rows.append(project_row(to_project(data, update_timestamp)))
+            except Exception as e:
+                error_logs.append(f"{e}, data: {data}")
+    finally:
+        workbook.close()
+    return rows, error_logs
+
+
+def to_project(data: dict, update_timestamp: datetime) -> ProjectCreate:
+    return ProjectCreate(
+        g_project_key=str(data.get("G_PROJECT_KEY") or ""),
+        spp_vspp_rowid=str(data.get("SPP_VSPP_ROWID") or ""),
+        e_license_rowid=str(data.get("E_LICENSE_ROWID") or ""),
+        pk_powersystemresource=str(
+            data.get("PK_POWERSYSTEMRESOURCE") or ""),
+        erc_cd=str(data.get("ERC_CD") or ""),
+        org=data.get("ORG"),
+        spp_vspp_plant_cd=data.get("SPP_VSPP_PLANT_CD"),
+        ppa_contract_no=data.get("PPA_CONTRACT_NO"),
+        project_name=data.get("PROJECT_NAME"),
+        spp_vspp_project_name=data.get("SPP_VSPP_PROJECT_NAME"),
+        licensee=data.get("LICENSEE"),
+        display_addr=data.get("DISPLAY_ADDR"),
+        subdistrict=data.get("SUBDISTRICT"),
+        district=data.get("DISTRICT"),
+        province=data.get("PROVINCE"),
+        country_zone=data.get("COUNTRY_ZONE"),
+        egat_zone=data.get("EGAT_ZONE"),
+        contract_status=data.get("CONTRACT_STATUS"),
+        e_license_instl_mw=data.get("E_LICENSE_INSTL_MW"),
+        e_license_instl_kva=data.get("E_LICENSE_INSTL_KVA"),
+        installed_cap_mw=data.get("INSTALLED_CAP_MW"),
+        contracted_cap_mw=data.get("CONTRACTED_CAP_MW"),
+        project_type=data.get("PROJECT_TYPE"),
+        contract_type=data.get("CONTRACT_TYPE"),
+        technology_a_group_1=data.get("TECHNOLOGY_A_GROUP_1"),
+        technology_a_group_2=data.get("TECHNOLOGY_A_GROUP_2"),
+        technology_a_detail=data.get("TECHNOLOGY_A_DETAIL"),
+        primary_fuel_a_group_1=data.get("PRIMARY_FUEL_A_GROUP_1"),
+        primary_fuel_a_group_2=data.get("PRIMARY_FUEL_A_GROUP_2"),
+        primary_fuel_a_group_3=data.get("PRIMARY_FUEL_A_GROUP_3"),
+        secondary_fuel_a_group_1=data.get("SECONDARY_FUEL_A_GROUP_1"),
+        secondary_fuel_a_group_2=data.get("SECONDARY_FUEL_A_GROUP_2"),
+        secondary_fuel_a_group_3=data.get("SECONDARY_FUEL_A_GROUP_3"),
+        technology_b_group_1=data.get("TECHNOLOGY_B_GROUP_1"),
+        technology_b_group_2=data.get("TECHNOLOGY_B_GROUP_2"),
+        technology_b_detail=data.get("TECHNOLOGY_B_DETAIL"),
+        primary_fuel_b_group_1=data.get("PRIMARY_FUEL_B_GROUP_1"),
+        primary_fuel_b_group_2=data.get("PRIMARY_FUEL_B_GROUP_2"),
+        primary_fuel_b_group_3=data.get("PRIMARY_FUEL_B_GROUP_3"),
+        secondary_fuel_b_group_1=data.get("SECONDARY_FUEL_B_GROUP_1"),
+        secondary_fuel_b_group_2=data.get("SECONDARY_FUEL_B_GROUP_2"),
+        secondary_fuel_b_group_3=data.get("SECONDARY_FUEL_B_GROUP_3"),
+        utilization=data.get("UTILIZATION"),
+        scod=data.get("SCOD"),
+        cod=data.get("COD"),
+        lat=data.get("LAT"),
+        lng=data.get("LNG"),
+        is_egat_sys_gen=(str(data.get("IS_EGAT_SYS_GEN")) == '1'),
+        is_sharing_lic=(str(data.get("IS_SHARING_LIC")) == '1'),
+        licensingno=data.get("LICENSINGNO"),
+        erc_district_no=str(data.get("ERC_DISTRICT_NO") or ""),
+        erc_district_displayname=data.get("ERC_DISTRICT_DISPLAYNAME"),
+        month_key=str(data.get("MONTH_KEY") or ""),
+        update_timestamp=update_timestamp)
+
+
+def project_row(project: ProjectCreate) -> dict:
+    row = project.model_dump()
+    row['content_hash'] = content_hash(row)
+    return row
+
+
+def content_hash(row: dict) -> str:
+    content = {k: v for k, v in row.items() if k not in UNHASHED_FIELDS}
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True,
+                   default=str).encode()).hexdigest()
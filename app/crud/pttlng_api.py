@@ -1,19 +1,26 @@
-import requests
 import logging
+import numpy as np
 import xml.etree.ElementTree as ET
-import asyncio
 from datetime import datetime, date, time
 from fastapi import HTTPException
 from app.crud import natural_gas
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.core import http_client
+from app.core.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+LMPT2_URL = 'https://tpasystem.pttlng.com/LNGTPA-API/'
+LEVEL_DESCRIPTIONS = {'Level-Tank 1-mm.': 1, 'Level-Tank 2-mm.': 2}
 
-def get_current_lmpt1_invent():
+# *gas day -> tank -> (timestamps, levels in mm) from the TPA API
+lmpt2_level_cache = LRUCache(maxsize=settings.LMPT2_CACHE_SIZE)
+
+
+async def get_current_lmpt1_invent():
     url = 'https://www.pttlngphc.com/api_sendout.php?key=888999'
-    response = requests.get(url)
+    response = await http_client.get(url)
 
     if response.status_code == 200:
         root = ET.fromstring(response.content)
@@ -38,90 +45,99 @@ def get_current_lmpt1_invent():
 
 
 async def get_current_lmpt2_invent(db: AsyncSession):
-    params = {
-        'keyid': settings.LMPT2_API_KEY,
-        'gasday': date.today().strftime('%d/%m/%Y')
-    }
-    headers = {'Content-Type': 'application/json'}
-    url = 'https://tpasystem.pttlng.com/LNGTPA-API/'
-    response = requests.post(url, json=params, headers=headers)
-    timestamp = datetime.now().replace(minute=0, second=0, microsecond=0)
-    level_tank1 = 0
-    level_tank2 = 0
+    default_timestamp = datetime.now().replace(minute=0,
+                                               second=0,
+                                               microsecond=0)
+    return await __get_latest_lmpt2_invent(db, date.today(),
+                                           default_timestamp)
 
-    if response.status_code == 200:
-        # *get latest value
-        for record in response.json():
-            if record['DESCRIPTION'] == 'Level-Tank 1-mm.':
-                dt = datetime.strptime(record['DATE'], "%Y-%m-%d %H:%M:%S.%f")
-                if dt >= timestamp:
-                    timestamp = dt
-                    level_tank1 = float(record['VALUE'])
-
-            if record['DESCRIPTION'] == 'Level-Tank 2-mm.':
-                dt = datetime.strptime(record['DATE'], "%Y-%m-%d %H:%M:%S.%f")
-                if dt >= timestamp:
-                    timestamp = dt
-                    level_tank2 = float(record['VALUE'])
-
-        # *calculate inventory (await async functions)
-        logger.debug(f'tank1 level: {level_tank1}, tank2 level: {level_tank2}')
-        invent1 = await natural_gas.cal_inventory(db=db,
-                                                  level=level_tank1,
-                                                  tank=1)
-        invent2 = await natural_gas.cal_inventory(db=db,
-                                                  level=level_tank2,
-                                                  tank=2)
-        invent = invent1 + invent2
-        logger.info(invent)
-
-        return {'timestamp': timestamp, 'value': invent}
 
-    else:
-        logger.error(f'{response}: {response.json()}')
-        raise HTTPException(
-            status_code=500,
-            detail=f'({response.status_code}): {response.text}')
+async def get_eod_lmpt2_invent(db: AsyncSession, request_date: date):
+    return await __get_latest_lmpt2_invent(
+        db, request_date, datetime.combine(request_date, time(0, 0)))
+
+
+async def __get_latest_lmpt2_invent(db: AsyncSession, gas_day: date,
+                                    default_timestamp: datetime) -> dict:
+    # *inventory at the last level reading of each tank in the gas day, a
+    # *tank without readings counts as 0 mm at default_timestamp
+    levels = await get_lmpt2_levels(gas_day)
+    timestamp = default_timestamp
+    latest = {}
+    for tank, (timestamps, tank_levels) in levels.items():
+        latest[tank] = 0
+        if len(timestamps):
+            latest[tank] = float(tank_levels[-1])
+            timestamp = max(timestamp, timestamps[-1].astype(datetime))
 
+    logger.debug(f"Latest timestamp: {timestamp}")
+    logger.debug(
+        f"Tank1 Level: {latest[1]} mm, Tank2 Level: {latest[2]} mm")
+
+    await natural_gas.ensure_tank_table(db)
+    invent1 = natural_gas.cal_inventory(level=latest[1], tank=1)
+    invent2 = natural_gas.cal_inventory(level=latest[2], tank=2)
+    total_inventory = invent1 + invent2
+
+    logger.info(f"Calculated Inventory: {total_inventory}")
+    return {'timestamp': timestamp, 'value': total_inventory}
+
+
+async def get_lmpt2_levels(gas_day: date) -> dict:
+    # *every tank level reading of the gas day, sorted by time
+    levels = lmpt2_level_cache.get(gas_day)
+    if levels is not None:
+        return levels
 
-async def get_eod_lmpt2_invent(db: AsyncSession, request_date: date):
     params = {
         'keyid': settings.LMPT2_API_KEY,
-        'gasday': request_date.strftime('%d/%m/%Y')
+        'gasday': gas_day.strftime('%d/%m/%Y')
     }
     headers = {'Content-Type': 'application/json'}
-    url = 'https://tpasystem.pttlng.com/LNGTPA-API/'
-
-    response = requests.post(url, json=params, headers=headers)
-
+    response = await http_client.post(LMPT2_URL, json=params, headers=headers)
     if response.status_code != 200:
         logger.error(f"API error: {response.status_code} - {response.text}")
         raise HTTPException(status_code=500, detail="LMPT2 API failed")
 
-    records = response.json()
-    latest_time = datetime.combine(request_date, time(0, 0))
-
-    # Find latest levels for each tank
-    async def find_latest_level(records, desc: str):
-        return max(((datetime.strptime(
-            rec['DATE'], "%Y-%m-%d %H:%M:%S.%f"), float(rec['VALUE']))
-                    for rec in records if rec['DESCRIPTION'] == desc),
-                   default=(latest_time, 0),
-                   key=lambda x: x[0])
-
-    t1_time, level_tank1 = await find_latest_level(records, 'Level-Tank 1-mm.')
-    t2_time, level_tank2 = await find_latest_level(records, 'Level-Tank 2-mm.')
-    timestamp = max(t1_time, t2_time)
-
-    logger.debug(f"Latest timestamp: {timestamp}")
-    logger.debug(
-        f"Tank1 Level: {level_tank1} mm, Tank2 Level: {level_tank2} mm")
-
-    # Await inventory calculations
-    invent1, invent2 = await asyncio.gather(
-        natural_gas.cal_inventory(db=db, level=level_tank1, tank=1),
-        natural_gas.cal_inventory(db=db, level=level_tank2, tank=2))
-    total_inventory = invent1 + invent2
-
-    logger.info(f"Calculated Inventory: {total_inventory}")
-    return {'timestamp': timestamp, 'value': total_inventory}
+    readings = {tank: [] for tank in LEVEL_DESCRIPTIONS.values()}
+    for record in response.json():
+        tank = LEVEL_DESCRIPTIONS.get(record['DESCRIPTION'])
+        if tank is None:
+            continue
+        dt = datetime.strptime(record['DATE'], "%Y-%m-%d %H:%M:%S.%f")
+        readings[tank].append((dt, float(record['VALUE'])))
+
+    levels = {}
+    for tank, values in readings.items():
+        values.sort()
+        levels[tank] = (np.array([dt for dt, _ in values],
+                                 dtype='datetime64[ms]'),
+                        np.array([value for _, value in values], dtype=float))
+
+    if gas_day < date.today():
+        lmpt2_level_cache.set(gas_day, levels)
+    else:
+        lmpt2_level_cache.set(gas_day, levels, ttl=settings.LMPT2_TODAY_TTL)
+    return levels
+
+
+async def get_lmpt2_invent_profile(db: AsyncSession, gas_day: date) -> list:
+    # *[(timestamp, tank1 m3, tank2 m3)] at every reading of either tank,
+    # *each tank carries its last level forward, 0 mm before its first one
+    levels = await get_lmpt2_levels(gas_day)
+    await natural_gas.ensure_tank_table(db)
+
+    timeline = np.union1d(levels[1][0], levels[2][0])
+    inventories = []
+    for tank in (1, 2):
+        timestamps, tank_levels = levels[tank]
+        level = np.zeros(len(timeline))
+        if len(timestamps):
+            position = np.searchsorted(timestamps, timeline, side='right') - 1
+            known = position >= 0
+            level[known] = tank_levels[position[known]]
+        inventories.append(natural_gas.cal_inventory(level, tank))
+
+    return list(
+        zip(timeline.tolist(), inventories[0].tolist(),
+            inventories[1].tolist()))
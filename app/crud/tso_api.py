@@ -1,8 +1,8 @@
-import requests
 import logging
 from datetime import datetime
 from app.core.config import settings
-from requests.auth import HTTPBasicAuth
+from app.core import http_client
+from app.core.cache import LRUCache
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
@@ -10,10 +10,76 @@ logger = logging.getLogger(__name__)
 user = settings.TSO_API_USER
 pwd = settings.TSO_API_PWD
 
+# *TSO point -> (dashboard, category)
+TAG_CATALOG = {
+    # *natural-gas/current/supply
+    'GULF-GAS': ('supply', 'got'),
+    'FD-SPE-LNG': ('supply', 'lng'),
+    'FD-SPE-LMPT2': ('supply', 'lng'),
+    'FD-SPW-MIX_W': ('supply', 'myanmar'),
+    'ESAN-SUPPLY': ('supply', 'onshore'),
+    # *natural-gas/current/demand
+    'TOTAL-DEMAND-EAST-EGAT': ('demand', 'egat'),
+    'TOTAL-DEMAND-EAST-IPP': ('demand', 'ipp'),
+    'TOTAL-DEMAND-EAST-SPP': ('demand', 'spp'),
+    'FD-GSP-UGSPRY_TOTAL': ('demand', 'gsp'),
+    'TOTAL-DEMAND-EAST-OTHER-IND': ('demand', 'ind'),
+    'TOTAL-DEMAND-EAST-OTHER-NGV': ('demand', 'ngv'),
+    'TOTAL-DEMAND-EAST-OTHER-FUEL': ('demand', 'fuel'),
+    'FD-IPP-MIX_WEST': ('demand', 'ipp'),
+    'FD_SPP_ONSW_MIX': ('demand', 'spp'),
+    'FD-EGAT-MIX_WEST': ('demand', 'egat'),
+    'TOTAL-DEMAND-WEST-OTHER-IND': ('demand', 'ind'),
+    'TOTAL-DEMAND-WEST-OTHER-NGV': ('demand', 'ngv'),
+    'TOTAL-DEMAND-WEST-OTHER-FUEL': ('demand', 'fuel'),
+    'FD-EGAT-CHN': ('demand', 'egat'),
+    'FD-IPP-KN4': ('demand', 'ipp'),
+    'FLOW-NGV-CHANA': ('demand', 'ngv'),
+    'FD-GSP-UGSP4': ('demand', 'gsp'),
+    'FD-EGAT-NPO': ('demand', 'egat'),
+    'FLOW-NGV-NPO': ('demand', 'ngv'),
+    # *natural-gas/update/lng/sendout-invent
+    'ACCF-SPE-LNG': ('lng_eod', 'lmpt1_sendout'),
+    'ACCF-SPE-LMPT2': ('lng_eod', 'lmpt2_sendout'),
+    'INVEN_SPE_LNG_A': ('lng_eod', 'lmpt1_invent'),
+    'INVEN_SPE_LNG_B': ('lng_eod', 'lmpt1_invent'),
+    'INVEN_SPE_LNG_C': ('lng_eod', 'lmpt1_invent'),
+    'INVEN_SPE_LNG_D': ('lng_eod', 'lmpt1_invent'),
+}
+
+DASHBOARD_TAGS: dict[str, list[str]] = {}
+for point, (dashboard, _) in TAG_CATALOG.items():
+    DASHBOARD_TAGS.setdefault(dashboard, []).append(point)
+
+# *the current tiles refresh together from one request
+CURRENT_DASHBOARDS = ('supply', 'demand')
+
+# *dashboards -> latest values, shared by the tiles for TSO_LATEST_TTL
+latest_cache = LRUCache(maxsize=8)
+
+
+async def get_current_supply_mmscfd():
+    latest = await get_latest()
+    for record in latest['supply']:
+        yield record
+
+
+async def get_current_demand_mmscfd():
+    latest = await get_latest()
+    for record in latest['demand']:
+        yield record
+
+
+async def get_latest(dashboards: tuple = CURRENT_DASHBOARDS) -> dict:
+    # *latest value of every point of the given dashboards in one call
+    # *returns dashboard -> [{'tag', 'timestamp', 'value'}]
+    key = tuple(dashboards)
+    latest = latest_cache.get(key)
+    if latest is not None:
+        return latest
 
-def get_current_supply_mmscfd():
     tags = [
-        'GULF-GAS', 'FD-SPE-LNG', 'FD-SPE-LMPT2', 'FD-SPW-MIX_W', 'ESAN-SUPPLY'
+        tag for dashboard in dashboards for tag in DASHBOARD_TAGS[dashboard]
     ]
     params = __gen_params(limt=1)
     url = __gen_url(tags=tags)
@@ -21,131 +87,61 @@ def get_current_supply_mmscfd():
     logger.debug(url)
     logger.debug(params)
 
-    response = requests.get(url=url,
-                            params=params,
-                            auth=HTTPBasicAuth(user, pwd))
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            for key in data.keys():
-                if key == 'GULF-GAS':
-                    tag = 'got'
-                elif key == 'FD-SPE-LNG' or key == 'FD-SPE-LMPT2':
-                    tag = 'lng'
-                elif key == 'FD-SPW-MIX_W':
-                    tag = 'myanmar'
-                elif key == 'ESAN-SUPPLY':
-                    tag = 'onshore'
-                else:
-                    continue
-
-                timestamp_ms = data[key][0]['timestamp']
-                yield {
-                    'tag': tag,
-                    'timestamp': datetime.fromtimestamp(timestamp_ms / 1000),
-                    'value': data[key][0]['value']
-                }
-        except Exception as e:
-            logger.exception(e)
-    else:
-        logger.error(f'{response}: {response.json()}')
-        raise HTTPException(
-            status_code=500,
-            detail=f'({response.status_code}): {response.text}')
-
-
-def get_current_demand_mmscfd():
-    tags = [
-        'TOTAL-DEMAND-EAST-EGAT', 'TOTAL-DEMAND-EAST-IPP',
-        'TOTAL-DEMAND-EAST-SPP', 'FD-GSP-UGSPRY_TOTAL',
-        'TOTAL-DEMAND-EAST-OTHER-IND', 'TOTAL-DEMAND-EAST-OTHER-NGV',
-        'TOTAL-DEMAND-EAST-OTHER-FUEL', 'FD-IPP-MIX_WEST',
-        'FD_SPP_ONSW_MIX, FD-EGAT-MIX_WEST', 'TOTAL-DEMAND-WEST-OTHER-IND',
-        'TOTAL-DEMAND-WEST-OTHER-NGV', 'TOTAL-DEMAND-WEST-OTHER-FUEL',
-        'FD-EGAT-CHN, FD-IPP-KN4', 'FLOW-NGV-CHANA', 'FD-GSP-UGSP4',
-        'FD-EGAT-NPO, FLOW-NGV-NPO'
-    ]
-    params = __gen_params(limt=1)
-    url = __gen_url(tags=tags)
-
-    logger.debug(url)
-    logger.debug(params)
-
-    response = requests.get(url=url,
-                            params=params,
-                            auth=HTTPBasicAuth(user, pwd))
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            for key in data.keys():
-                if 'EGAT' in key:
-                    tag = 'egat'
-                elif 'IPP' in key:
-                    tag = 'ipp'
-                elif 'SPP' in key:
-                    tag = 'spp'
-                elif 'GSP' in key:
-                    tag = 'gsp'
-                elif 'IND' in key:
-                    tag = 'ind'
-                elif 'NGV' in key:
-                    tag = 'ngv'
-                elif 'FUEL' in key:
-                    tag = 'fuel'
-                else:
-                    continue
-
-                timestamp_ms = data[key][0]['timestamp']
-                yield {
-                    'tag': tag,
-                    'timestamp': datetime.fromtimestamp(timestamp_ms / 1000),
-                    'value': data[key][0]['value']
-                }
-        except Exception as e:
-            logger.exception(e)
-    else:
-        logger.error(f'{response}: {response.json()}')
+    response = await http_client.get(url, params=params, auth=(user, pwd))
+    if response.status_code != 200:
+        logger.error(f'{response}: {response.text}')
         raise HTTPException(
             status_code=500,
             detail=f'({response.status_code}): {response.text}')
 
-
-def get_lng_sendout_invent(request_date: datetime):
-    tags = [
-        'ACCF-SPE-LNG', 'ACCF-SPE-LMPT2', 'INVEN_SPE_LNG_A', 'INVEN_SPE_LNG_B',
-        'INVEN_SPE_LNG_C', 'INVEN_SPE_LNG_D'
-    ]
+    latest = {dashboard: [] for dashboard in dashboards}
+    try:
+        data = response.json()
+        for point, values in data.items():
+            if point not in TAG_CATALOG or not values:
+                continue
+            dashboard, tag = TAG_CATALOG[point]
+            timestamp_ms = values[0]['timestamp']
+            latest[dashboard].append({
+                'tag': tag,
+                'timestamp': datetime.fromtimestamp(timestamp_ms / 1000),
+                'value': values[0]['value']
+            })
+    except Exception as e:
+        logger.exception(e)
+        return latest
+
+    latest_cache.set(key, latest, ttl=settings.TSO_LATEST_TTL)
+    return latest
+
+
+async def get_lng_sendout_invent(request_date: datetime):
     params = __gen_params(limt=1, dt=request_date)
-    url = __gen_url(tags=tags)
+    url = __gen_url(tags=DASHBOARD_TAGS['lng_eod'])
 
     logger.debug(url)
     logger.debug(params)
 
-    response = requests.get(url=url,
-                            params=params,
-                            auth=HTTPBasicAuth(user, pwd))
+    response = await http_client.get(url, params=params, auth=(user, pwd))
     if response.status_code == 200:
         try:
             data = response.json()
-            for key in data.keys():
-                if key == 'ACCF-SPE-LNG':
-                    tag = 'lmpt1_sendout'
-                elif key == 'ACCF-SPE-LMPT2':
-                    tag = 'lmpt2_sendout'
-                elif 'INVEN' in key:
-                    tag = 'lmpt1_invent'
-                timestamp_ms = data[key][0]['timestamp']
+            for point, values in data.items():
+                if point not in TAG_CATALOG or not values:
+                    continue
+                _, tag = TAG_CATALOG[point]
+                timestamp_ms = values[0]['timestamp']
 
                 dt = datetime.fromtimestamp(timestamp_ms / 1000)
                 yield {
                     'tag': tag,
                     'date': dt.strftime('%Y-%m-%d %H:%M %Z'),
-                    'value': data[key][0]['value']
+                    'value': values[0]['value']
                 }
         except Exception as e:
             logger.exception(e)
     else:
-        logger.error(f'{response}: {response.json()}')
+        logger.error(f'{response}: {response.text}')
         raise HTTPException(
             status_code=500,
             detail=f'({response.status_code}): {response.text}')
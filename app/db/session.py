@@ -13,3 +13,10 @@ async_session = sessionmaker(bind=engine,
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
+
+
+async def get_driver_connection(session: AsyncSession):
+    # *asyncpg connection behind the session, inside its current transaction
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    return raw_connection.driver_connection
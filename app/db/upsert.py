@@ -0,0 +1,36 @@
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# *asyncpg sends at most 32767 bind parameters per statement
+MAX_PARAMETERS = 32767
+
+
+async def upsert_rows(db: AsyncSession, model, rows: list[dict],
+                      index_elements: list[str]) -> int:
+    # *one multi-row INSERT .. ON CONFLICT DO UPDATE per batch, every other
+    # *column of the row is overwritten. Rows repeating a key are collapsed
+    # *first, the last one wins, since postgres refuses to update the same
+    # *row twice in one statement. The caller commits
+    unique = {tuple(row[key] for key in index_elements): row for row in rows}
+    rows = list(unique.values())
+    if not rows:
+        return 0
+
+    columns = list(rows[0])
+    batch_size = min(settings.INGEST_BATCH_SIZE,
+                     MAX_PARAMETERS // len(columns))
+    for start in range(0, len(rows), batch_size):
+        stmt = insert(model).values(rows[start:start + batch_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={
+                column: stmt.excluded[column]
+                for column in columns if column not in index_elements
+            })
+        await db.execute(stmt)
+    logger.debug(f'{len(rows)} rows upserted into {model.__tablename__}')
+    return len(rows)
@@ -1,20 +1,38 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.db.session import engine
+from app.db.session import engine, async_session
 from app.db.base import Base
-from app.api.v1.endpoints import electric, natural_gas
+from app.api.v1.endpoints import electric, natural_gas, system, jobs
+from app.api.v1 import poller
+from app.crud import egat_api
+from app.crud import natural_gas as natural_gas_crud
 from app.core.config import setup_logging
-
-app = FastAPI(title="Temporary Data for ECCC dashboard")
-setup_logging()
-logger = logging.getLogger(__name__)
+from app.core import http_client, workers
+from app.core import jobs as job_queue
 
 
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as db:
+        await natural_gas_crud.load_tank_table(db)
+    poller.start()
+
+    yield
+
+    await poller.stop()
+    await job_queue.stop()
+    egat_api.stop_token_refresh()
+    await http_client.close_client()
+    workers.shutdown()
+
+
+app = FastAPI(title="Temporary Data for ECCC dashboard", lifespan=lifespan)
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 app.include_router(electric.router,
@@ -24,3 +42,11 @@ app.include_router(electric.router,
 app.include_router(natural_gas.router,
                    prefix="/api/v1/natural-gas",
                    tags=["natural-gas"])
+
+app.include_router(system.router,
+                   prefix="/api/v1/system",
+                   tags=["system"])
+
+app.include_router(jobs.router,
+                   prefix="/api/v1/jobs",
+                   tags=["jobs"])
@@ -1,23 +1,70 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Boolean, Index, UniqueConstraint, DDL, event
+from sqlalchemy.dialects.postgresql import JSONB
 from app.db.base import Base
 
 
 class DummyData(Base):
     __tablename__ = "electricDummyData"
+    # *range partitioned by data_timestamp month, one partition per month
+    # *(see crud.electric.ensure_dummy_data_partitions) plus a default one
+    __table_args__ = (
+        Index('ix_electricDummyData_category_data_submit', 'category',
+              'data_timestamp', 'submit_timestamp'),
+        Index('ix_electricDummyData_data_timestamp_brin',
+              'data_timestamp',
+              postgresql_using='brin'),
+        Index('ix_electricDummyData_submit_timestamp_brin',
+              'submit_timestamp',
+              postgresql_using='brin'),
+        {
+            'postgresql_partition_by': 'RANGE (data_timestamp)'
+        },
+    )
     id = Column(Integer,
                 primary_key=True,
-                index=True,
                 autoincrement=True,
                 nullable=False)
-    submit_timestamp = Column(DateTime, index=True, nullable=False)
-    data_timestamp = Column(DateTime, index=True, nullable=False)
-    category = Column(String(16), index=True, nullable=False)
-    zone = Column(String, index=True, nullable=True)
-    province = Column(String, index=True, nullable=True)
-    value_tag = Column(String, index=True, nullable=True)
+    submit_timestamp = Column(DateTime, nullable=False)
+    data_timestamp = Column(DateTime, primary_key=True, nullable=False)
+    category = Column(String(16), nullable=False)
+    zone = Column(String, nullable=True)
+    province = Column(String, nullable=True)
+    value_tag = Column(String, nullable=True)
     value = Column(Float, nullable=False)
 
 
+# *rows outside every monthly partition land here instead of failing
+event.listen(
+    DummyData.__table__, 'after_create',
+    DDL('CREATE TABLE IF NOT EXISTS "electricDummyData_default" '
+        'PARTITION OF "electricDummyData" DEFAULT'))
+
+
+class DummyDataLatest(Base):
+    __tablename__ = "electricDummyDataLatest"
+    # *latest submission of electricDummyData per data_timestamp, maintained
+    # *by /submit/dummy. A NULL zone/province/value_tag stays NULL, apart
+    # *from '', and still counts as one key
+    __table_args__ = (UniqueConstraint('category',
+                                       'data_timestamp',
+                                       'zone',
+                                       'province',
+                                       'value_tag',
+                                       name='uq_electricDummyDataLatest_key',
+                                       postgresql_nulls_not_distinct=True), )
+    id = Column(Integer,
+                primary_key=True,
+                autoincrement=True,
+                nullable=False)
+    category = Column(String(16), nullable=False)
+    data_timestamp = Column(DateTime, nullable=False)
+    zone = Column(String, nullable=True)
+    province = Column(String, nullable=True)
+    value_tag = Column(String, nullable=True)
+    value = Column(Float, nullable=False)
+    submit_timestamp = Column(DateTime, nullable=False)
+
+
 class Project(Base):
     __tablename__ = "electricProjects"
 
@@ -75,10 +122,15 @@ class Project(Base):
     erc_district_displayname = Column(String)
     month_key = Column(String)
     update_timestamp = Column(DateTime, index=True)
+    # *sha256 of the project fields, see crud.project_sheet.content_hash
+    content_hash = Column(String(64), nullable=True)
 
 
 class PeakDay(Base):
     __tablename__ = "electricPeakDay"
+    __table_args__ = (UniqueConstraint('peak_date',
+                                       'peak_type',
+                                       name='uq_electricPeakDay_date_type'), )
     id = Column(Integer,
                 primary_key=True,
                 index=True,
@@ -88,3 +140,26 @@ class PeakDay(Base):
     peak_datetime = Column(DateTime, index=True, nullable=False)
     peak_type = Column(String, index=True, nullable=False)
     value = Column(Float, nullable=False)
+
+
+class DayProfile(Base):
+    __tablename__ = "electricDayProfile"
+    # *finalized upstream day series, source 'sysgen' keyed by reqMw index,
+    # *'customer_direct' uses index 0
+    source = Column(String(32), primary_key=True)
+    index = Column(Integer, primary_key=True)
+    profile_date = Column(Date, primary_key=True, index=True)
+    values = Column(JSONB, nullable=False)
+    update_timestamp = Column(DateTime, nullable=False)
+
+
+class GenProfile(Base):
+    __tablename__ = "electricGenProfile"
+    # *finalized half-hour generation of a closed day, grouped by plant type
+    # *or fuel
+    source = Column(Integer, primary_key=True)
+    group_by = Column(String(16), primary_key=True)
+    profile_date = Column(Date, primary_key=True, index=True)
+    tag = Column(String, primary_key=True)
+    data_timestamp = Column(DateTime, primary_key=True)
+    value = Column(Float, nullable=False)
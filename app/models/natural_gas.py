@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, Date, DateTime, String
+from sqlalchemy import Column, Integer, Float, Date, DateTime, String, UniqueConstraint
 from app.db.base import Base
 
 
@@ -12,6 +12,9 @@ class TankTable(Base):
 
 class EodValue(Base):
     __tablename__ = 'naturalGasEodValue'
+    __table_args__ = (UniqueConstraint('date',
+                                       'tag',
+                                       name='uq_naturalGasEodValue_date_tag'), )
 
     id = Column(Integer,
                 unique=True,
@@ -8,6 +8,10 @@ class Msg(BaseModel):
     message: Optional[str]
 
 
+class JobMsg(Msg):
+    job_id: str
+
+
 class Item(BaseModel):
     tag: str
     value: Optional[float] = 0
@@ -44,9 +48,25 @@ class LocationItem(BaseModel):
     lng: float
 
 
+class FuelStat(BaseModel):
+    tag: str
+    count: int
+    mw: float
+
+
+class ClusterItem(BaseModel):
+    # *tag is the grid cell, zoom/column/row
+    tag: str
+    lat: float
+    lng: float
+    count: int
+    mw: float
+    fuels: List[FuelStat] = []
+
+
 class Items(BaseModel):
     datetime: datetime
     status: str
     items: List[Item | ItemWithPercent
                 | TimeseriesItem | ItemWithTimestamp | LocationItem
-                | ItemWithMax | DateseriesItem] = []
+                | ItemWithMax | DateseriesItem | ClusterItem] = []
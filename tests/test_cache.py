@@ -0,0 +1,64 @@
+import pytest
+from app.core import cache
+from app.core.cache import LRUCache
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr(cache, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_least_recently_used_entry_is_evicted():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1
+    lru.set('c', 3)
+    assert lru.get('b') is None
+    assert lru.get('a') == 1 and lru.get('c') == 3
+    assert len(lru) == 2
+
+
+def test_setting_an_existing_key_refreshes_it():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.set('a', 10)
+    lru.set('c', 3)
+    assert lru.get('a') == 10
+    assert lru.get('b') is None
+
+
+def test_entry_expires_after_its_ttl(clock):
+    lru = LRUCache(maxsize=4)
+    lru.set('today', 1, ttl=5)
+    lru.set('past', 2)
+    clock[0] += 4.9
+    assert lru.get('today') == 1
+    clock[0] += 0.1
+    assert lru.get('today', 'missing') == 'missing'
+    assert len(lru) == 1
+    clock[0] += 10**6
+    assert lru.get('past') == 2
+
+
+def test_stats_count_hits_and_misses(clock):
+    lru = LRUCache(maxsize=4)
+    lru.set('a', 1, ttl=1)
+    lru.get('a')
+    lru.get('b')
+    clock[0] += 1
+    lru.get('a')
+    assert lru.stats() == {'size': 0, 'maxsize': 4, 'hits': 1, 'misses': 2}
+
+
+def test_pop_and_clear():
+    lru = LRUCache(maxsize=4)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.pop('a') == 1
+    assert lru.pop('a', 'gone') == 'gone'
+    lru.clear()
+    assert len(lru) == 0
@@ -0,0 +1,97 @@
+import pytest
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, 'monotonic', clock)
+    return clock
+
+
+def open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker('host', failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure('timeout')
+    return breaker
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker('host', failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure('timeout')
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+    breaker.record_failure('timeout')
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()['last_failure'] == 'timeout'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker('host', failure_threshold=2, reset_timeout=30)
+    breaker.record_failure('timeout')
+    breaker.record_success()
+    breaker.record_failure('timeout')
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 1
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = open_breaker()
+    clock.now += 29.9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 0.1
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_successful_probe_closes(clock):
+    breaker = open_breaker()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_for_another_timeout(clock):
+    breaker = open_breaker()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure('500')
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 1
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_aborted_probe_frees_the_slot(clock):
+    breaker = open_breaker()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_aborted()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
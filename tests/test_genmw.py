@@ -0,0 +1,127 @@
+import random
+import pytest
+from datetime import date
+from app.crud.genmw import GenDay, HOUR_LIST, half_hour_timestamps
+
+DAY = date(2026, 10, 1)
+
+
+def make_rows(source: int, count: int = 40) -> list[dict]:
+    rng = random.Random(source)
+    type_field = 'PLANTTYPE' if source == 1 else 'TYPE'
+    types = ['EGAT', 'IPP', 'SPP', 'VSPP-SPP', 'OTHER', '', None]
+    names = ['BPK-C1', 'IMP-LAO', 'ZZ_SCOD-X', 'MM-T1']
+    fuels = ['NATURAL GAS', 'RENEWABLE', 'HYDRO', 'COAL', 'OIL', 'DIESEL', '']
+    rows = []
+    for i in range(count):
+        row = {hour: round(rng.uniform(0, 500), 1) for hour in HOUR_LIST}
+        row.update({
+            'MEANAME': f'{rng.choice(names)}-{i}',
+            type_field: rng.choice(types),
+            'FUEL': rng.choice(fuels)
+        })
+        rows.append(row)
+    return rows
+
+
+def loop_by_type(rows: list[dict], source: int) -> list[dict]:
+    # *the per-cell loop GenDay replaced
+    dt_list = half_hour_timestamps(DAY)
+    result = {'total': {'tag': 'total', 'values': [(dt, 0) for dt in dt_list]}}
+    for item in rows:
+        plant_type = item['PLANTTYPE' if source == 1 else 'TYPE']
+        if not plant_type:
+            continue
+        if 'IMP' in item['MEANAME']:
+            plant_type = 'imp'
+        elif source == 1 and 'ZZ_SCOD' in item['MEANAME']:
+            continue
+        elif 'EGAT' in plant_type:
+            plant_type = 'egat'
+        elif 'IPP' in plant_type:
+            plant_type = 'ipp'
+        elif 'SPP' in plant_type:
+            plant_type = 'spp'
+        else:
+            continue
+        if plant_type not in result:
+            result[plant_type] = {
+                'tag': plant_type,
+                'values': [(dt, 0) for dt in dt_list]
+            }
+        for i, hour in enumerate(HOUR_LIST):
+            for tag in (plant_type, 'total'):
+                old_dt, old_value = result[tag]['values'][i]
+                result[tag]['values'][i] = (old_dt, old_value + item[hour])
+    return list(result.values())
+
+
+def loop_by_fuel(rows: list[dict]) -> list[dict]:
+    dt_list = half_hour_timestamps(DAY)
+    tags = [('GAS', 'ก๊าซธรรมชาติ'), ('RENEWABLE', 'พลังงานทดแทน'),
+            ('HYDRO', 'พลังงานน้ำ'), ('COAL', 'ถ่านหิน'), ('OIL', 'น้ำมัน')]
+    result = {}
+    for item in rows:
+        fuel = next((tag for keyword, tag in tags
+                     if item['FUEL'] and keyword in item['FUEL']), None)
+        if fuel is None:
+            continue
+        if fuel not in result:
+            result[fuel] = {'tag': fuel, 'values': [(dt, 0) for dt in dt_list]}
+        for i, hour in enumerate(HOUR_LIST):
+            old_dt, old_value = result[fuel]['values'][i]
+            result[fuel]['values'][i] = (old_dt, old_value + item[hour])
+    return list(result.values())
+
+
+def assert_profiles_equal(actual: list[dict], expected: list[dict]):
+    assert [item['tag'] for item in actual] == [item['tag'] for item in expected]
+    for got, want in zip(actual, expected):
+        assert [dt for dt, _ in got['values']] == [dt for dt, _ in want['values']]
+        assert [value for _, value in got['values']] == pytest.approx(
+            [value for _, value in want['values']])
+
+
+@pytest.mark.parametrize('source', [1, 2])
+def test_profile_by_type_matches_the_loop(source):
+    rows = make_rows(source)
+    assert_profiles_equal(
+        GenDay(rows, DAY, source).profile('type'), loop_by_type(rows, source))
+
+
+@pytest.mark.parametrize('source', [1, 2])
+def test_profile_by_fuel_matches_the_loop(source):
+    rows = make_rows(source)
+    assert_profiles_equal(
+        GenDay(rows, DAY, source).profile('fuel'), loop_by_fuel(rows))
+
+
+def test_current_reads_one_column():
+    rows = make_rows(1)
+    day = GenDay(rows, DAY, 1)
+    expected = {
+        item['tag']: item['values'][5][1]
+        for item in loop_by_type(rows, 1) if item['tag'] != 'total'
+    }
+    assert day.current(HOUR_LIST[5]) == pytest.approx(expected)
+
+
+def test_missing_readings_count_as_zero():
+    rows = [{'MEANAME': 'A', 'PLANTTYPE': 'EGAT', 'F0H': 10.0, 'F1': None},
+            {'MEANAME': 'B', 'PLANTTYPE': 'EGAT', 'F0H': 5.0}]
+    values = dict(GenDay(rows, DAY, 1).profile('type')[1]['values'])
+    timestamps = half_hour_timestamps(DAY)
+    assert values[timestamps[0]] == 15.0
+    assert values[timestamps[1]] == 0.0
+
+
+def test_empty_day_has_only_a_zero_total():
+    profile = GenDay([], DAY, 1).profile('type')
+    assert [item['tag'] for item in profile] == ['total']
+    assert {value for _, value in profile[0]['values']} == {0.0}
+    assert GenDay([], DAY, 1).profile('fuel') == []
+
+
+def test_unknown_group_by():
+    with pytest.raises(ValueError):
+        GenDay([], DAY, 1).profile('zone')
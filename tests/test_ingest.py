@@ -0,0 +1,84 @@
+import csv
+import asyncio
+import pytest
+from io import BytesIO, StringIO
+from fastapi import HTTPException, UploadFile
+from app.core import ingest
+from app.core.ingest import ErrorLog, open_csv
+
+# *quoted fields spanning lines, escaped quotes, Thai text (3 bytes per
+# *character in UTF-8), a blank line, a short row and a long row
+CSV_TEXT = ('DTM,ZONE,PROVINCE,TYPE,VALDUMMY\r\n'
+            '2026-10-01 00:30,"A, B",กรุงเทพมหานคร,ips,1.5\r\n'
+            '2026-10-01 01:00,"line one\nline two",เชียงใหม่,ips,2\r\n'
+            '\r\n'
+            '2026-10-01 01:30,"say ""hi""",,vspp,3\r\n'
+            '2026-10-01 02:00,short\r\n'
+            '2026-10-01 02:30,z,p,t,4,extra,more\r\n'
+            '2026-10-01 03:00,ภาคใต้,สงขลา,ips,5')
+
+
+def read_all(data: bytes, batch_size: int) -> tuple[list[dict], list[int]]:
+
+    async def run():
+        stream = await open_csv(UploadFile(BytesIO(data), filename='x.csv'),
+                                {'DTM', 'VALDUMMY'}, batch_size)
+        rows, sizes = [], []
+        async for batch in stream.batches():
+            rows += batch
+            sizes.append(len(batch))
+        assert stream.rows == len(rows)
+        assert stream.bytes == len(data)
+        return rows, sizes
+
+    return asyncio.run(run())
+
+
+def test_matches_dictreader_at_every_chunk_size(monkeypatch):
+    data = ('\ufeff' + CSV_TEXT).encode()
+    expected = list(csv.DictReader(StringIO(CSV_TEXT, newline='')))
+    for chunk_size in range(1, len(data) + 2):
+        monkeypatch.setattr(ingest.settings, 'UPLOAD_CHUNK_SIZE', chunk_size)
+        rows, _ = read_all(data, batch_size=100)
+        assert rows == expected, f'chunk size {chunk_size}'
+
+
+def test_batches_are_bounded(monkeypatch):
+    monkeypatch.setattr(ingest.settings, 'UPLOAD_CHUNK_SIZE', 16)
+    lines = ['DTM,VALDUMMY'] + [f'2026-10-01 00:{i:02d},{i}' for i in range(7)]
+    rows, sizes = read_all('\n'.join(lines).encode(), batch_size=3)
+    assert sizes == [3, 3, 1]
+    assert [row['VALDUMMY'] for row in rows] == [str(i) for i in range(7)]
+
+
+def test_header_only_file_has_no_rows():
+    rows, sizes = read_all(b'DTM,VALDUMMY\n', batch_size=3)
+    assert rows == [] and sizes == []
+
+
+def test_missing_columns_are_rejected():
+    with pytest.raises(HTTPException) as error:
+        read_all(b'DTM,OTHER\n1,2\n', batch_size=3)
+    assert error.value.status_code == 400
+    assert 'VALDUMMY' in error.value.detail
+
+
+def test_undecodable_file_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        read_all(b'DTM,VALDUMMY\n\xff\xfe\n', batch_size=3)
+    assert error.value.status_code == 400
+
+
+def test_error_log_keeps_the_first_messages_and_counts_all():
+    errors = ErrorLog(max_size=2)
+    for i in range(5):
+        errors.append(f'row {i}')
+    assert len(errors) == 5
+    assert errors.messages == ['row 0', 'row 1']
+    assert str(errors) == 'row 0\nrow 1\n... and 3 more'
+
+
+def test_error_log_under_the_cap_has_no_suffix():
+    errors = ErrorLog(max_size=2)
+    errors.append('row 0')
+    assert str(errors) == 'row 0'
@@ -0,0 +1,97 @@
+import random
+import pytest
+from app.crud.project_clusters import ProjectClusters, cell_size
+
+WORLD = (-90, -180, 90, 180)
+
+
+def project(lat, lng, fuel='solar', mw=1.0) -> dict:
+    return {'lat': lat, 'lng': lng, 'fuel': fuel, 'mw': mw}
+
+
+def random_projects(count: int) -> list[dict]:
+    rng = random.Random(25)
+    return [
+        project(rng.uniform(5, 21), rng.uniform(97, 106),
+                rng.choice(['solar', 'wind', 'biomass', None]),
+                rng.choice([rng.uniform(0, 90), None])) for _ in range(count)
+    ]
+
+
+def test_no_projects():
+    clusters = ProjectClusters([], max_zoom=3)
+    assert clusters.fuels == []
+    for zoom in range(4):
+        assert clusters.query(zoom, *WORLD) == []
+
+
+def test_projects_without_location_are_skipped():
+    clusters = ProjectClusters(
+        [project(None, 100.5), project(13.7, None), project(13.7, 100.5)], 2)
+    assert [cluster['count'] for cluster in clusters.query(0, *WORLD)] == [1]
+
+
+@pytest.mark.parametrize('zoom', [0, 4, 8, 12])
+def test_world_query_keeps_every_project(zoom):
+    projects = random_projects(2000)
+    clusters = ProjectClusters(projects, max_zoom=12).query(zoom, *WORLD)
+    assert sum(cluster['count'] for cluster in clusters) == 2000
+    assert sum(cluster['mw'] for cluster in clusters) == pytest.approx(
+        sum(item['mw'] or 0 for item in projects))
+    for cluster in clusters:
+        assert sum(fuel['count'] for fuel in cluster['fuels']) == cluster['count']
+        assert sum(fuel['mw'] for fuel in cluster['fuels']) == pytest.approx(
+            cluster['mw'])
+
+
+def test_clusters_split_as_zoom_grows():
+    clusters = ProjectClusters(random_projects(500), max_zoom=10)
+    counts = [len(clusters.query(zoom, *WORLD)) for zoom in range(11)]
+    assert counts == sorted(counts)
+    assert counts[0] < counts[-1]
+
+
+def test_bounding_box_selects_only_overlapping_cells():
+    clusters = ProjectClusters(
+        [project(13.75, 100.5), project(18.79, 98.98), project(7.0, 100.47)],
+        max_zoom=10)
+    inside = clusters.query(10, 13, 100, 14, 101)
+    assert [cluster['count'] for cluster in inside] == [1]
+    assert inside[0]['lat'] == pytest.approx(13.75)
+    assert clusters.query(10, 0, 0, 1, 1) == []
+
+
+def test_cell_centroid_and_fuel_breakdown():
+    clusters = ProjectClusters([
+        project(13.70, 100.50, 'solar', 2.0),
+        project(13.71, 100.51, 'wind', 3.0),
+        project(13.72, 100.52, None, 5.0)
+    ], max_zoom=4)
+    [cluster] = clusters.query(4, *WORLD)
+    assert cluster['count'] == 3
+    assert cluster['mw'] == pytest.approx(10.0)
+    assert cluster['lat'] == pytest.approx(13.71)
+    assert cluster['lng'] == pytest.approx(100.51)
+    assert {fuel['tag']: (fuel['count'], fuel['mw'])
+            for fuel in cluster['fuels']} == {
+                'N/A': (1, 5.0),
+                'solar': (1, 2.0),
+                'wind': (1, 3.0)
+            }
+
+
+def test_antimeridian_and_poles_are_kept():
+    corners = [project(90, 180), project(-90, -180), project(90, -180),
+               project(-90, 180)]
+    clusters = ProjectClusters(corners, max_zoom=6)
+    for zoom in range(7):
+        assert sum(cluster['count']
+                   for cluster in clusters.query(zoom, *WORLD)) == 4
+    east = clusters.query(6, -90, 180 - cell_size(6), 90, 180)
+    assert sum(cluster['count'] for cluster in east) == 2
+
+
+def test_zoom_outside_the_pyramid_is_clamped():
+    clusters = ProjectClusters(random_projects(50), max_zoom=5)
+    assert clusters.query(20, *WORLD) == clusters.query(5, *WORLD)
+    assert clusters.query(-1, *WORLD) == clusters.query(0, *WORLD)
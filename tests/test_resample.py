@@ -0,0 +1,56 @@
+import pytest
+from datetime import datetime
+from app.core.resample import resample, resample_timeseries, value_at
+
+# *seconds from midnight, buckets are labelled by their end: (end - 30 min, end]
+SERIES = [[0, 1.0], [60, 2.0], [1800, 3.0], [1801, 4.0], [3600, 6.0]]
+
+
+@pytest.mark.parametrize('how, expected', [
+    ('last', [[0, 1.0], [1800, 3.0], [3600, 6.0]]),
+    ('mean', [[0, 1.0], [1800, 2.5], [3600, 5.0]]),
+    ('max', [[0, 1.0], [1800, 3.0], [3600, 6.0]]),
+    ('min', [[0, 1.0], [1800, 2.0], [3600, 4.0]]),
+])
+def test_buckets_are_end_labelled(how, expected):
+    assert resample(SERIES, 30, how) == expected
+
+
+def test_unsorted_input_is_sorted_and_ties_keep_input_order():
+    series = [[120, 5.0], [30, 1.0], [60, 2.0], [60, 3.0]]
+    assert resample(series, 1, 'last') == [[60, 3.0], [120, 5.0]]
+    assert resample(series, 1, 'min') == [[60, 1.0], [120, 5.0]]
+
+
+def test_one_minute_points_at_minute_resolution_are_unchanged():
+    series = [[60 * i, float(i)] for i in range(10)]
+    assert resample(series, 1, 'last') == series
+
+
+def test_empty_series():
+    assert resample([], 30) == []
+    assert resample_timeseries([], 30) == []
+
+
+@pytest.mark.parametrize('resolution, how', [(7, 'last'), (30, 'sum')])
+def test_invalid_arguments(resolution, how):
+    with pytest.raises(ValueError):
+        resample(SERIES, resolution, how)
+
+
+def test_resample_timeseries_counts_from_midnight():
+    values = [(datetime(2026, 10, 1, 0, 10), 1.0),
+              (datetime(2026, 10, 1, 0, 20), 2.0),
+              (datetime(2026, 10, 1, 0, 40), 3.0)]
+    assert resample_timeseries(values, 30, 'mean') == [
+        (datetime(2026, 10, 1, 0, 30), 1.5),
+        (datetime(2026, 10, 1, 1, 0), 3.0),
+    ]
+
+
+def test_value_at():
+    series = [[60, 1.0], [120, 2.0], [180, 3.0]]
+    assert value_at(series, 0) == [60, 1.0]
+    assert value_at(series, 120) == [120, 2.0]
+    assert value_at(series, 150) == [120, 2.0]
+    assert value_at(series, 999) == [180, 3.0]
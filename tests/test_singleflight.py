@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from app.core.singleflight import SingleFlight
+
+
+def counting_call(calls: list, result, delay: float = 0.01):
+
+    async def call():
+        calls.append(result)
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return call
+
+
+def test_concurrent_callers_share_one_call():
+
+    async def run():
+        flight, calls = SingleFlight(), []
+        results = await asyncio.gather(*(flight.do(
+            'key', counting_call(calls, 'value'), 'label') for _ in range(10)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(run())
+    assert calls == ['value']
+    assert results == ['value'] * 10
+    assert flight.stats() == {
+        'calls': 10,
+        'coalesced': 9,
+        'inflight': 0,
+        'by_label': {
+            'label': {
+                'calls': 10,
+                'coalesced': 9
+            }
+        }
+    }
+
+
+def test_different_keys_do_not_share():
+
+    async def run():
+        flight, calls = SingleFlight(), []
+        return await asyncio.gather(flight.do('a', counting_call(calls, 1)),
+                                    flight.do('b', counting_call(calls, 2)))
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_finished_call_is_not_reused():
+
+    async def run():
+        flight, calls = SingleFlight(), []
+        await flight.do('key', counting_call(calls, 1))
+        await flight.do('key', counting_call(calls, 2))
+        return calls
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_error_reaches_every_caller_and_clears_the_key():
+
+    async def run():
+        flight, calls = SingleFlight(), []
+        results = await asyncio.gather(
+            *(flight.do('key', counting_call(calls, RuntimeError('down')))
+              for _ in range(3)),
+            return_exceptions=True)
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()['inflight'] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+
+    async def run():
+        flight, calls = SingleFlight(), []
+        first = asyncio.create_task(
+            flight.do('key', counting_call(calls, 'value', delay=0.05)))
+        second = asyncio.create_task(
+            flight.do('key', counting_call(calls, 'other')))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return calls, await second
+
+    assert asyncio.run(run()) == (['value'], 'value')
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from sqlalchemy.dialects import postgresql
+from app.db import upsert
+from app.db.upsert import MAX_PARAMETERS, upsert_rows
+from app.models.electric import PeakDay
+
+KEYS = ['peak_date', 'peak_type']
+
+
+class RecordingSession:
+    # *collects the compiled statements instead of running them
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt.compile(dialect=postgresql.dialect()))
+
+
+def peak_rows(count: int, peak_type: str = 'demand') -> list[dict]:
+    start = date(2020, 1, 1)
+    return [{
+        'peak_date': start + timedelta(days=i),
+        'peak_type': peak_type,
+        'peak_datetime': datetime(2020, 1, 1) + timedelta(days=i),
+        'value': float(i)
+    } for i in range(count)]
+
+
+def run(rows: list[dict]) -> tuple[int, RecordingSession]:
+    db = RecordingSession()
+    written = asyncio.run(upsert_rows(db, PeakDay, rows, KEYS))
+    return written, db
+
+
+def test_batches_stay_under_the_parameter_cap(monkeypatch):
+    monkeypatch.setattr(upsert.settings, 'INGEST_BATCH_SIZE', 10**6)
+    rows = peak_rows(20000)
+    written, db = run(rows)
+    assert written == 20000
+    per_statement = [len(compiled.params) for compiled in db.statements]
+    assert max(per_statement) <= MAX_PARAMETERS
+    # *4 columns, 32767 // 4 = 8191 rows per statement
+    assert len(db.statements) == 3
+    assert sum(per_statement) == 20000 * 4
+
+
+def test_batches_follow_ingest_batch_size(monkeypatch):
+    monkeypatch.setattr(upsert.settings, 'INGEST_BATCH_SIZE', 3)
+    written, db = run(peak_rows(7))
+    assert written == 7
+    assert [len(compiled.params) // 4 for compiled in db.statements] == [3, 3, 1]
+
+
+def test_repeated_keys_collapse_to_the_last_row():
+    rows = peak_rows(2) + [{**peak_rows(1)[0], 'value': 99.0}]
+    written, db = run(rows)
+    assert written == 2
+    params = db.statements[0].params
+    values = sorted(value for name, value in params.items()
+                    if name.startswith('value'))
+    assert values == [1.0, 99.0]
+
+
+def test_same_date_different_type_are_separate_keys():
+    written, _ = run(peak_rows(1, 'demand') + peak_rows(1, 'supply'))
+    assert written == 2
+
+
+def test_conflict_updates_only_the_other_columns():
+    _, db = run(peak_rows(1))
+    sql = db.statements[0].string
+    assert 'ON CONFLICT (peak_date, peak_type) DO UPDATE SET' in sql
+    update = sql.split('DO UPDATE SET', 1)[1]
+    assert 'peak_datetime = excluded.peak_datetime' in update
+    assert 'value = excluded.value' in update
+    assert 'peak_date =' not in update and 'peak_type =' not in update
+
+
+def test_no_rows_no_statement():
+    written, db = run([])
+    assert written == 0 and db.statements == []